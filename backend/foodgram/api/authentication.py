@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+SECRET_FIELDS = ('password', )
+# from_db ждет значения в порядке полей модели
+CACHED_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname not in SECRET_FIELDS
+)
+
+
+def get_shared_cache():
+    """общий кэш токенов, если он задан в настройках."""
+    alias = settings.TOKEN_AUTH_CACHE
+    return caches[alias] if alias else None
+
+
+def get_cache_key(key):
+    return f'auth_token_user:v2:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def pack_user(user):
+    """значения всех полей пользователя, кроме секретных."""
+    return tuple(getattr(user, field) for field in CACHED_FIELDS)
+
+
+def unpack_user(values):
+    """новый экземпляр пользователя на каждый запрос, как из БД.
+
+    Хеш пароля в кэше не хранится и загружается из БД при первом
+    обращении к нему, остальные поля доступны без запросов.
+    """
+    return User.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, values)
+
+
+class TokenCache:
+    """Кэш токен -> поля пользователя со временем жизни.
+
+    С общим кэшем TOKEN_AUTH_CACHE записи хранятся только в нем, и
+    выход или блокировка пользователя сбрасывают их во всех процессах
+    сразу. Без него используется LRU в памяти процесса: изменения в
+    этом процессе сбрасывают записи сразу, в других процессах запись
+    живет не дольше TOKEN_AUTH_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        shared_cache = get_shared_cache()
+        if shared_cache:
+            values = shared_cache.get(get_cache_key(key))
+            return None if values is None else unpack_user(values)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                return unpack_user(entry[1])
+            self._entries.pop(key, None)
+        return None
+
+    def set(self, key, user):
+        values = pack_user(user)
+        shared_cache = get_shared_cache()
+        if shared_cache:
+            shared_cache.set(
+                get_cache_key(key), values, settings.TOKEN_AUTH_CACHE_TTL)
+            return
+        expires = time.monotonic() + settings.TOKEN_AUTH_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (user.pk, values, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        shared_cache = get_shared_cache()
+        if shared_cache:
+            shared_cache.delete(get_cache_key(key))
+
+    def invalidate_user(self, user_id):
+        """сброс всех токенов пользователя."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry[0] == user_id:
+                    del self._entries[key]
+        shared_cache = get_shared_cache()
+        if shared_cache:
+            shared_cache.delete_many([
+                get_cache_key(key) for key in Token.objects.filter(
+                    user_id=user_id).values_list('key', flat=True)
+            ])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД для недавно виденных токенов."""
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+        token = Token(key=key, user_id=user.pk)
+        token.user = user
+        return user, token
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
+from rest_framework.response import Response
+
+from recipes.changes import get_version
+
+
+class VersionedCacheMixin:
+    """Кэширование ответов справочника по его версии.
+
+    Ответы хранятся в кэше под ключом с версией справочника, которая
+    сама читается из кэша, поэтому повторные запросы и 304 не обращаются
+    к БД. Ответы отдаются с ETag, Last-Modified и Cache-Control, а на
+    If-None-Match/If-Modified-Since возвращается 304 без чтения
+    справочника. В ключ входят путь и только значимые для ответа
+    параметры запроса, приведенные к одному виду.
+    """
+    cache_version_name = None
+    cache_max_age = 60
+    cache_timeout = 60 * 60
+    cache_query_params = ()
+
+    def get_cache_params(self, request):
+        """параметры запроса, от которых зависит ответ."""
+        return {
+            param: request.query_params[param]
+            for param in self.cache_query_params
+            if param in request.query_params
+        }
+
+    def get_cached_response(self, request, build_response):
+        version, modified = get_version(self.cache_version_name)
+        params = urlencode(sorted(self.get_cache_params(request).items()))
+        path = hashlib.sha1(f'{request.path}?{params}'.encode()).hexdigest()
+        etag = f'"{self.cache_version_name}-{version}-{path[:16]}"'
+        last_modified = int(modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            key = f'{self.cache_version_name}:{version}:{path}'
+            data = cache.get(key)
+            if data is None:
+                response = build_response()
+                if response.status_code != 200:
+                    return response
+                data = response.data
+                cache.set(key, data, self.cache_timeout)
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(
+            response, public=True, max_age=self.cache_max_age)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(VersionedCacheMixin, self).list(
+                request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(VersionedCacheMixin, self).retrieve(
+                request, *args, **kwargs))
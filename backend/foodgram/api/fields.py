@@ -0,0 +1,33 @@
+import io
+
+from django.conf import settings
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+
+class RecipeImageField(Base64ImageField):
+    """Base64-изображение с ограничениями размера.
+
+    Объем проверяется до декодирования base64, а число пикселей -
+    по заголовку картинки, до выделения памяти под растр.
+    """
+
+    def to_internal_value(self, base64_data):
+        if (isinstance(base64_data, str) and len(base64_data) * 3 // 4
+                > settings.RECIPE_IMAGE_MAX_BYTES):
+            raise serializers.ValidationError(
+                'Файл изображения больше '
+                f'{settings.RECIPE_IMAGE_MAX_BYTES // 2 ** 20} МБ!')
+        return super().to_internal_value(base64_data)
+
+    def get_file_extension(self, filename, decoded_file):
+        try:
+            with Image.open(io.BytesIO(decoded_file)) as image:
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                f'Изображение {width}x{height} слишком большое!')
+        return super().get_file_extension(filename, decoded_file)
@@ -1,24 +1,58 @@
+from django import forms
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filter
-from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from recipes.changes import TAGS, get_version
+from recipes.models import Recipe, Tag, TagRecipe
+from recipes.search import search_recipes
 from users.models import User
 
+TAG_IDS_TIMEOUT = 60 * 60
+
+
+def get_tag_ids(slugs):
+    """id тегов по slug из кэша по версии тегов.
+
+    Неизвестный slug перепроверяется по БД: тег мог быть создан
+    до того, как сменилась версия.
+    """
+    version, _ = get_version(TAGS)
+    key = f'{TAGS}:{version}:slug_ids'
+    tag_ids = cache.get(key)
+    if tag_ids is None or not tag_ids.keys() >= set(slugs):
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, TAG_IDS_TIMEOUT)
+    return [tag_ids[slug] for slug in slugs if slug in tag_ids]
+
 
 class RecipeFilter(filter.FilterSet):
     """Фильтр для рецептов."""
     author = filter.ModelChoiceFilter(
         queryset=User.objects.all())
-    tags = filter.AllValuesMultipleFilter(
-        field_name='tags__slug'
-    )
+    tags = filter.Filter(method='get_tags', widget=forms.SelectMultiple)
     is_favorited = filter.BooleanFilter(method='get_favorite')
     is_in_shopping_cart = filter.BooleanFilter(
         method='get_is_in_shopping_cart')
+    search = filter.CharFilter(method='get_search')
+    ordering = filter.OrderingFilter(
+        fields=(('favorites_count', 'popular'), ('pub_date', 'pub_date'))
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search'
+        ]
+
+    def get_tags(self, queryset, name, value):
+        """с любым из тегов, через EXISTS без дублей рецептов"""
+        tag_ids = get_tag_ids(value)
+        if not tag_ids:
+            return queryset.none()
+        return queryset.annotate(has_tags=Exists(
+            TagRecipe.objects.filter(recipe=OuterRef('pk'), tag__in=tag_ids)
+        )).filter(has_tags=True)
 
     def get_favorite(self, queryset, name, value):
         """в избранном"""
@@ -32,6 +66,6 @@ class RecipeFilter(filter.FilterSet):
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
 
-
-class IngredientSearchFilter(SearchFilter):
-    search_param = 'name'
+    def get_search(self, queryset, name, value):
+        """полнотекстовый поиск по названию, описанию и ингредиентам"""
+        return search_recipes(queryset, value)
@@ -0,0 +1,66 @@
+import threading
+from bisect import bisect_left
+
+from recipes.changes import INGREDIENTS, get_version
+from recipes.models import Ingredient
+
+
+def normalize(text):
+    """приведение названия к виду для поиска: регистр и ё -> е."""
+    return text.casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+    """Отсортированный в памяти индекс ингредиентов для поиска по префиксу.
+
+    Строится при первом запросе. Версия справочника хранится в БД,
+    поэтому после изменения в любом процессе (админка, load_ingredients)
+    каждый процесс перестраивает свой индекс, как только истечет
+    закэшированная версия. Поиск с актуальным индексом не обращается к БД.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ([], [])
+
+    def build(self):
+        """загрузка справочника из БД."""
+        rows = sorted(
+            (normalize(name), name, pk, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit')
+        )
+        self._index = (
+            [row[0] for row in rows],
+            [
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for _, name, pk, unit in rows
+            ],
+        )
+
+    def refresh(self):
+        """перестроение индекса, если справочник изменился."""
+        version = get_version(INGREDIENTS)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self.build()
+                self._version = version
+
+    def search(self, prefix, limit):
+        """ингредиенты, название которых начинается с prefix."""
+        self.refresh()
+        keys, items = self._index
+        prefix = normalize(prefix)
+        start = bisect_left(keys, prefix)
+        result = []
+        for position in range(start, min(start + limit, len(keys))):
+            if not keys[position].startswith(prefix):
+                break
+            result.append(items[position])
+        return result
+
+
+ingredient_index = IngredientPrefixIndex()
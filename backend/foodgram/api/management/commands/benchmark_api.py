@@ -0,0 +1,265 @@
+import json
+import math
+import platform
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from jobs.models import Job
+from recipes.management.commands.generate_dataset import (EMAIL_DOMAIN,
+                                                          PASSWORD)
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAQMAAAAl21bKAAAAA'
+    '1BMVEUAAACnej3aAAAAAXRSTlMAQObYZgAAAApJREFUCNdjYAAAAAIAAeIhvDMAAAAASUVO'
+    'RK5CYII='
+)
+
+
+def percentile(values, share):
+    """перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    """замер задержек и числа запросов для всех маршрутов API.
+
+    Запускается на данных generate_dataset, локально на SQLite:
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=bench.sqlite3.
+    """
+    help = 'Бенчмарк маршрутов api/urls.py с отчетом в JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare',
+            help='JSON предыдущего прогона для поиска регрессий',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='допустимый рост p50 относительно прошлого прогона',
+        )
+
+    def handle(self, *args, **options):
+        self.prepare()
+        started = timezone.now()
+        results = {}
+        with override_settings(MEDIA_ROOT=tempfile.mkdtemp()):
+            for name, steps in self.get_scenarios():
+                results[name] = self.measure(steps, options['repeat'])
+                self.stdout.write(
+                    f"{name:45} p50 {results[name]['p50_ms']:8.2f} мс  "
+                    f"p95 {results[name]['p95_ms']:8.2f} мс  "
+                    f"запросов {results[name]['queries']}"
+                )
+        # задачи выгрузки из сценария ?async не должны копиться в очереди
+        Job.objects.filter(
+            user=self.user, name='api.export_shopping_list',
+            created__gte=started,
+        ).delete()
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'recipes': Recipe.objects.count(),
+            'users': User.objects.count(),
+            'endpoints': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Результаты сохранены в {options['output']}"))
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+
+    def prepare(self):
+        """выбор пользователя, рецептов и авторов для сценариев."""
+        self.user = User.objects.filter(
+            email__endswith=f'@{EMAIL_DOMAIN}'
+        ).annotate(
+            follows=Count('follower')
+        ).order_by('-follows', 'id').first()
+        if self.user is None:
+            raise CommandError('Сначала выполните generate_dataset')
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.anonymous = Client()
+        self.recipe = Recipe.objects.exclude(
+            favorites__user=self.user).exclude(
+            shopping_cart__user=self.user).first()
+        self.author = User.objects.exclude(
+            author__user=self.user).exclude(pk=self.user.pk).first()
+        self.tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        self.ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:3])
+
+    def get_scenarios(self):
+        """маршруты api/urls.py; изменяющие данные идут парами туда-обратно."""
+        recipe, author = self.recipe.id, self.author.id
+        tags = '&'.join(f'tags={slug}' for slug in self.tags)
+        pantry = '&'.join(f'ingredients={pk}' for pk in self.ingredients)
+        recipe_data = {
+            'ingredients': [
+                {'id': pk, 'amount': 10} for pk in self.ingredients],
+            'tags': list(Tag.objects.values_list('id', flat=True)[:1]),
+            'image': IMAGE,
+            'name': 'Бенчмарк',
+            'text': 'Бенчмарк',
+            'cooking_time': 10,
+        }
+        return [
+            ('GET recipes (anonymous)', [
+                (self.anonymous, 'get', '/api/recipes/', None)]),
+            ('GET recipes', [(self.client, 'get', '/api/recipes/', None)]),
+            ('GET recipes ?limit=50', [
+                (self.client, 'get', '/api/recipes/?limit=50', None)]),
+            ('GET recipes deep page', [
+                (self.client, 'get', '/api/recipes/?page=50', None)]),
+            ('GET recipes cursor', [(
+                self.client, 'get', '/api/recipes/?pagination=cursor', None
+            )]),
+            ('GET recipes ?tags', [
+                (self.client, 'get', f'/api/recipes/?{tags}', None)]),
+            ('GET recipes ?search', [(
+                self.client, 'get', '/api/recipes/?search=рецепт', None)]),
+            ('GET recipes ?is_favorited', [(
+                self.client, 'get', '/api/recipes/?is_favorited=1', None)]),
+            ('GET recipes ?is_in_shopping_cart', [(
+                self.client, 'get', '/api/recipes/?is_in_shopping_cart=1',
+                None)]),
+            ('GET recipe detail', [
+                (self.client, 'get', f'/api/recipes/{recipe}/', None)]),
+            ('GET recipe similar', [(
+                self.client, 'get', f'/api/recipes/{recipe}/similar/', None
+            )]),
+            ('GET recipes/feed', [
+                (self.client, 'get', '/api/recipes/feed/', None)]),
+            ('GET recipes/pantry', [
+                (self.client, 'get', f'/api/recipes/pantry/?{pantry}', None)]),
+            ('POST+PATCH+DELETE recipe', [
+                (self.client, 'post', '/api/recipes/', recipe_data),
+                (self.client, 'patch', '/api/recipes/{id}/', recipe_data),
+                (self.client, 'delete', '/api/recipes/{id}/', None),
+            ]),
+            ('GET tags', [(self.client, 'get', '/api/tags/', None)]),
+            ('GET ingredients', [
+                (self.client, 'get', '/api/ingredients/', None)]),
+            ('GET ingredients ?name', [
+                (self.client, 'get', '/api/ingredients/?name=са', None)]),
+            ('GET users', [(self.client, 'get', '/api/users/', None)]),
+            ('GET users/me', [(self.client, 'get', '/api/users/me/', None)]),
+            ('GET user detail', [
+                (self.client, 'get', f'/api/users/{author}/', None)]),
+            ('GET subscriptions', [(
+                self.client, 'get',
+                '/api/users/subscriptions/?recipes_limit=3', None)]),
+            ('POST+DELETE subscribe', [
+                (self.client, 'post', f'/api/users/{author}/subscribe/', None),
+                (self.client, 'delete', f'/api/users/{author}/subscribe/',
+                 None),
+            ]),
+            ('POST+DELETE favorite', [
+                (self.client, 'post', f'/api/recipes/{recipe}/favorite/',
+                 None),
+                (self.client, 'delete', f'/api/recipes/{recipe}/favorite/',
+                 None),
+            ]),
+            ('POST+DELETE shopping_cart', [
+                (self.client, 'post', f'/api/recipes/{recipe}/shopping_cart/',
+                 None),
+                (self.client, 'delete',
+                 f'/api/recipes/{recipe}/shopping_cart/', None),
+            ]),
+            ('POST+DELETE favorite batch', [
+                (self.client, 'post', '/api/recipes/favorite/',
+                 {'ids': [recipe]}),
+                (self.client, 'delete', '/api/recipes/favorite/',
+                 {'ids': [recipe]}),
+            ]),
+            ('POST+DELETE shopping_cart batch', [
+                (self.client, 'post', '/api/recipes/shopping_cart/',
+                 {'ids': [recipe]}),
+                (self.client, 'delete', '/api/recipes/shopping_cart/',
+                 {'ids': [recipe]}),
+            ]),
+            ('POST+DELETE subscribe batch', [
+                (self.client, 'post', '/api/users/subscribe/',
+                 {'ids': [author]}),
+                (self.client, 'delete', '/api/users/subscribe/',
+                 {'ids': [author]}),
+            ]),
+            ('GET shopping_cart/summary', [(
+                self.client, 'get', '/api/recipes/shopping_cart/summary/',
+                None)]),
+            ('GET download_shopping_cart', [(
+                self.client, 'get', '/api/recipes/download_shopping_cart/',
+                None)]),
+            ('GET download_shopping_cart ?async', [(
+                self.client, 'get',
+                '/api/recipes/download_shopping_cart/?async=true', None)]),
+            ('GET jobs', [(self.client, 'get', '/api/jobs/', None)]),
+            ('POST auth/token/login', [(
+                self.anonymous, 'post', '/api/auth/token/login/',
+                {'email': self.user.email, 'password': PASSWORD})]),
+        ]
+
+    def measure(self, steps, repeat):
+        """задержки сценария и число запросов к БД за один прогон."""
+        durations, statuses = [], set()
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(repeat):
+                created_id = None
+                started = time.perf_counter()
+                for client, method, url, data in steps:
+                    response = getattr(client, method)(
+                        url.format(id=created_id),
+                        data=json.dumps(data) if data else None,
+                        content_type='application/json',
+                    )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    if method == 'post' and response.status_code == 201:
+                        created_id = response.json().get('id')
+                    statuses.add(response.status_code)
+                durations.append((time.perf_counter() - started) * 1000)
+        return {
+            'p50_ms': round(percentile(durations, 0.5), 3),
+            'p95_ms': round(percentile(durations, 0.95), 3),
+            'p99_ms': round(percentile(durations, 0.99), 3),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'queries': len(context.captured_queries) // repeat,
+            'statuses': sorted(statuses),
+        }
+
+    def compare(self, results, path, threshold):
+        """сравнение с прошлым прогоном, при регрессиях - ошибка."""
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f)['endpoints']
+        regressions = []
+        for name, current in results.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            if current['queries'] > before['queries']:
+                regressions.append(
+                    f"{name}: запросов {before['queries']} -> "
+                    f"{current['queries']}")
+            if current['p50_ms'] > before['p50_ms'] * (1 + threshold):
+                regressions.append(
+                    f"{name}: p50 {before['p50_ms']} -> "
+                    f"{current['p50_ms']} мс")
+        if regressions:
+            raise CommandError(
+                'Найдены регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено.'))
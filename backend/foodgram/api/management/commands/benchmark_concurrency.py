@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.benchmark_api import percentile
+
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=50',
+    '/api/tags/',
+    '/api/ingredients/?name=са',
+    '/api/users/subscriptions/?recipes_limit=3',
+)
+
+
+class Command(BaseCommand):
+    """пропускная способность запущенного сервера при N параллельных
+    клиентах, для сравнения конфигураций gunicorn."""
+    help = 'Нагрузка на запущенный сервер с ростом числа клиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--paths', nargs='*', default=PATHS)
+        parser.add_argument(
+            '--concurrency', nargs='*', type=int, default=[1, 8, 32])
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--token', help='токен для авторизации')
+        parser.add_argument('--output', default='concurrency.json')
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f"Token {options['token']}"
+        try:
+            requests.get(options['url'] + options['paths'][0], timeout=5)
+        except requests.RequestException as error:
+            raise CommandError(f'Сервер недоступен: {error}')
+        results = {}
+        for clients in options['concurrency']:
+            result = self.run(options, clients, headers)
+            results[clients] = result
+            self.stdout.write(
+                f"клиентов {clients:4}: {result['rps']:8.1f} запр/с  "
+                f"p50 {result['p50_ms']:8.2f} мс  "
+                f"p95 {result['p95_ms']:8.2f} мс  "
+                f"ошибок {result['errors']}"
+            )
+        with open(options['output'], 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Отчет сохранен в {options['output']}."))
+
+    def run(self, options, clients, headers):
+        """клиенты по кругу запрашивают пути до истечения duration."""
+        timings, errors = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def client(number):
+            session = requests.Session()
+            session.headers.update(headers)
+            paths = options['paths']
+            position = number
+            while time.perf_counter() < deadline:
+                url = options['url'] + paths[position % len(paths)]
+                position += 1
+                started = time.perf_counter()
+                try:
+                    ok = session.get(url, timeout=30).status_code < 400
+                except requests.RequestException:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    (timings if ok else errors).append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(client, range(clients)))
+        elapsed = time.perf_counter() - started
+        if not timings:
+            raise CommandError('Ни одного успешного ответа.')
+        return {
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+            'requests': len(timings),
+            'errors': len(errors),
+        }
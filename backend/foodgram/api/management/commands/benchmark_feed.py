@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from recipes.feed import after, get_feed_keys
+from recipes.models import Recipe
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    """сравнение ленты подписок с прямым запросом по графу подписок."""
+    help = 'Замер страниц ленты: предрасчитанная лента против author__in'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=5,
+            help='число пользователей с наибольшим числом подписок',
+        )
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        users = list(User.objects.annotate(
+            following=Count('follower')
+        ).filter(following__gt=0).order_by('-following')[:options['users']])
+        if not users:
+            raise CommandError(
+                'Нет подписок, сначала выполните generate_dataset.')
+        for user in users:
+            naive = self.measure(
+                options, lambda position, limit: self.naive_keys(
+                    user, position, limit))
+            feed = self.measure(
+                options, lambda position, limit: get_feed_keys(
+                    user, position, limit))
+            if naive[2] != feed[2]:
+                self.stdout.write(self.style.ERROR(
+                    f'{user.username}: ленты расходятся'))
+            self.stdout.write(
+                f'{user.username}: подписок {user.following}, '
+                f'author__in {naive[0] * 1000:.3f} мс/стр '
+                f'({naive[1]} запр.), '
+                f'лента {feed[0] * 1000:.3f} мс/стр ({feed[1]} запр.), '
+                f'ускорение x{naive[0] / max(feed[0], 1e-9):.1f}'
+            )
+
+    def naive_keys(self, user, position, limit):
+        """та же страница прямым запросом по подпискам."""
+        return list(after(
+            Recipe.objects.filter(author__in=Follow.objects.filter(
+                user=user).values('author')), position, 'pk'
+        ).order_by('-pub_date', '-pk').values_list('pub_date', 'pk')[:limit])
+
+    def measure(self, options, get_keys):
+        """среднее время страницы при проходе pages страниц подряд."""
+        fetched = 0
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                position, keys = None, []
+                for _ in range(options['pages']):
+                    page = get_keys(position, options['page_size'])
+                    fetched += 1
+                    if not page:
+                        break
+                    keys.extend(page)
+                    position = page[-1]
+            elapsed = time.perf_counter() - started
+        return (
+            elapsed / fetched,
+            len(context.captured_queries) // fetched,
+            keys,
+        )
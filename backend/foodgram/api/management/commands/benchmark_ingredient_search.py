@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    """сравнение поиска ингредиентов по индексу в памяти и через БД."""
+    help = 'Замер поиска ингредиентов по префиксу: индекс против БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'prefixes', nargs='*',
+            default=['а', 'мо', 'сах', 'ёж', 'картоф'],
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat, limit = options['repeat'], options['limit']
+        ingredient_index.refresh()
+        for prefix in options['prefixes']:
+            db_time, db_queries, found = self.measure(
+                repeat, lambda: list(
+                    Ingredient.objects.filter(
+                        name__istartswith=prefix
+                    ).values('id', 'name', 'measurement_unit')
+                )
+            )
+            index_time, index_queries, _ = self.measure(
+                repeat, lambda: ingredient_index.search(prefix, limit)
+            )
+            self.stdout.write(
+                f'{prefix!r}: найдено {found}, '
+                f'БД {db_time * 1000:.3f} мс ({db_queries} запр.), '
+                f'индекс {index_time * 1000:.3f} мс '
+                f'({index_queries} запр.), '
+                f'ускорение x{db_time / max(index_time, 1e-9):.1f}'
+            )
+
+    def measure(self, repeat, func):
+        """среднее время вызова и число запросов к БД за вызов."""
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                result = func()
+            elapsed = time.perf_counter() - started
+        return (
+            elapsed / repeat,
+            len(context.captured_queries) // repeat,
+            len(result),
+        )
@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+from django.test.utils import CaptureQueriesContext
+
+from api.pantry_index import pantry_index
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    """сравнение подбора рецептов по кладовой: индекс против GROUP BY."""
+    help = 'Замер подбора рецептов по имеющимся ингредиентам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='*', type=int, default=[3, 5, 10],
+            help='число ингредиентов в кладовой',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        popular = list(Ingredient.objects.annotate(
+            used=Count('ingredientrecipe')
+        ).filter(used__gt=0).order_by('-used').values_list(
+            'pk', flat=True)[:200])
+        if not popular:
+            raise CommandError(
+                'Нет рецептов, сначала выполните generate_dataset.')
+        pantry_index.refresh()
+        generator = random.Random(options['seed'])
+        for size in options['sizes']:
+            pantry = generator.sample(popular, min(size, len(popular)))
+            db_time, db_queries, db_ids = self.measure(
+                options['repeat'], lambda: self.group_by(pantry))
+            index_time, index_queries, index_ids = self.measure(
+                options['repeat'], lambda: [
+                    row[0] for row in pantry_index.rank(pantry)])
+            if db_ids != index_ids:
+                self.stdout.write(self.style.ERROR(
+                    f'ингредиентов {size}: результаты расходятся'))
+            self.stdout.write(
+                f'ингредиентов {size}: найдено {len(index_ids)}, '
+                f'GROUP BY {db_time * 1000:.3f} мс ({db_queries} запр.), '
+                f'индекс {index_time * 1000:.3f} мс '
+                f'({index_queries} запр.), '
+                f'ускорение x{db_time / max(index_time, 1e-9):.1f}'
+            )
+
+    def group_by(self, pantry):
+        """тот же подбор агрегатом по всем связям рецептов."""
+        return list(Recipe.objects.annotate(
+            size=Count('ingredientrecipe'),
+            matched=Count(
+                'ingredientrecipe',
+                filter=Q(ingredientrecipe__ingredient__in=pantry)),
+        ).filter(matched__gt=0).annotate(
+            share=Cast(F('matched'), FloatField()) / F('size'),
+        ).order_by('-share', '-matched', '-pk').values_list('pk', flat=True))
+
+    def measure(self, repeat, func):
+        """среднее время вызова, число запросов и результат."""
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                result = func()
+            elapsed = time.perf_counter() - started
+        return (
+            elapsed / repeat,
+            len(context.captured_queries) // repeat,
+            result,
+        )
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tag
+
+
+class Command(BaseCommand):
+    """сравнение фильтра по тегам через EXISTS и через JOIN с DISTINCT."""
+    help = 'Замер фильтрации рецептов по 1..N тегам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=6)
+
+    def handle(self, *args, **options):
+        slugs = list(Tag.objects.values_list('slug', flat=True))
+        if not slugs:
+            self.stdout.write(self.style.ERROR(
+                'Нет тегов, сначала выполните load_tags и generate_dataset.'))
+            return
+        self.stdout.write(f'Рецептов: {Recipe.objects.count()}')
+        for number in range(1, len(slugs) + 1):
+            selected = slugs[:number]
+            join_time, join_queries, join_count = self.measure(
+                options, lambda: Recipe.objects.filter(
+                    tags__slug__in=selected).distinct())
+            exists_time, exists_queries, exists_count = self.measure(
+                options, lambda: RecipeFilter(
+                    {'tags': selected}, queryset=Recipe.objects.all()).qs)
+            self.stdout.write(
+                f'тегов {number}: найдено {exists_count} '
+                f'(JOIN {join_count}), '
+                f'JOIN+DISTINCT {join_time * 1000:.3f} мс '
+                f'({join_queries} запр.), '
+                f'EXISTS {exists_time * 1000:.3f} мс '
+                f'({exists_queries} запр.), '
+                f'ускорение x{join_time / max(exists_time, 1e-9):.1f}'
+            )
+
+    def measure(self, options, build_queryset):
+        """среднее время подсчета и первой страницы, запросов на вызов."""
+        repeat, page_size = options['repeat'], options['page_size']
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                queryset = build_queryset()
+                count = queryset.count()
+                list(queryset[:page_size])
+            elapsed = time.perf_counter() - started
+        return (
+            elapsed / repeat,
+            len(context.captured_queries) // repeat,
+            count,
+        )
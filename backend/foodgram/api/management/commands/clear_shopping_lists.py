@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import delete_expired_exports
+
+
+class Command(BaseCommand):
+    """удаление устаревших выгрузок списка покупок."""
+    help = 'Удаляем выгрузки списков покупок старше SHOPPING_LIST_EXPORT_TTL'
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_exports()
+        self.stdout.write(self.style.SUCCESS(f'Удалено выгрузок: {deleted}.'))
@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from api.filters import RecipeFilter
+from api.relations import SOURCES
+from api.shopping_list import get_shopping_list
+from jobs.models import Job
+from recipes.feed import get_feed_sources
+from recipes.models import (IngredientRecipe, Recipe, RecipeNeighbour,
+                            Tag)
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    """планы ключевых запросов API для проверки использования индексов."""
+    help = 'Печатаем EXPLAIN для основных запросов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='запросы для вывода, по умолчанию все',
+        )
+        parser.add_argument('--user', type=int, help='id пользователя')
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='EXPLAIN ANALYZE, только для PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        querysets = self.get_querysets(user)
+        unknown = set(options['names']) - set(querysets)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные запросы: {", ".join(sorted(unknown))}. '
+                f'Доступны: {", ".join(querysets)}.')
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--analyze доступен только в PostgreSQL.')
+            explain_options = {'analyze': True, 'buffers': True}
+        for name, queryset in querysets.items():
+            if options['names'] and name not in options['names']:
+                continue
+            self.stdout.write(self.style.SUCCESS(f'== {name}'))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
+
+    def get_user(self, user_id):
+        """пользователь с подписками, избранным и корзиной."""
+        if user_id is not None:
+            return User.objects.get(pk=user_id)
+        follow = Follow.objects.order_by('pk').first()
+        if follow is None:
+            raise CommandError(
+                'Нет подписок, сначала выполните generate_dataset.')
+        return follow.user
+
+    def get_querysets(self, user):
+        author = Follow.objects.filter(user=user).first().author
+        slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+        recipes = Recipe.objects.select_related('author')
+        page = list(recipes.values_list('pk', flat=True)[:6])
+        timeline, popular = get_feed_sources(
+            user, recipes.values_list('pub_date', 'pk').first())
+        querysets = {
+            'recipes': recipes[:6],
+            'recipes_by_author': recipes.filter(author=author)[:6],
+            'recipes_by_tags': RecipeFilter(
+                {'tags': slugs}, queryset=recipes).qs[:6],
+            'recipes_favorited': recipes.filter(favorites__user=user)[:6],
+            'recipes_in_cart': recipes.filter(shopping_cart__user=user)[:6],
+            'recipe_ingredients': IngredientRecipe.objects.filter(
+                recipe__in=page).select_related('ingredient'),
+            'subscriptions': User.objects.filter(author__user=user)[:6],
+            'subscription_recipes': Recipe.objects.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:3]
+            ), author__in=Follow.objects.filter(
+                user=user).values('author')),
+            'followers': Follow.objects.filter(
+                author=author).values_list('user_id', flat=True),
+            'feed_timeline': timeline[:7],
+            'feed_popular': popular[:7],
+            'similar_recipes': RecipeNeighbour.objects.filter(
+                recipe=page[0]).select_related('neighbour').order_by(
+                    '-score'),
+            'shopping_list': get_shopping_list(user),
+            'jobs_ready': Job.objects.filter(
+                status=Job.PENDING, run_at__lte=timezone.now()
+            ).order_by('run_at').values_list('pk', flat=True)[:10],
+        }
+        for kind, (model, target_field) in SOURCES.items():
+            querysets[f'relations_{kind}'] = model.objects.filter(
+                user_id=user.pk).values_list(target_field, flat=True)
+        return querysets
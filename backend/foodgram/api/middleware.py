@@ -0,0 +1,106 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('foodgram.performance')
+
+
+class QueryTimer:
+    """счетчик запросов к БД и их суммарного времени."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def get_view_name(view_func, request):
+    """имя представления вида RecipeViewSet.list."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+class ServerTimingMiddleware:
+    """Замер запросов к БД, представления, рендера и общего времени.
+
+    Включается PERFORMANCE_MONITORING. Заголовок Server-Timing
+    добавляется для staff или для всех при SERVER_TIMING_PUBLIC,
+    запросы дольше SLOW_REQUEST_THRESHOLD мс пишутся в лог.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_MONITORING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        request.performance = {'view': '-', 'render_started': None}
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        timings = self.get_timings(request, timer, started, finished)
+        total = finished - started
+        user = getattr(request, 'user', None)
+        if settings.SERVER_TIMING_PUBLIC or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={value * 1000:.1f}'
+                for name, value in timings.items()
+            ) + f', sql;desc="{timer.count} queries"'
+        if total * 1000 >= settings.SLOW_REQUEST_THRESHOLD:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'view': request.performance['view'],
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timer.count,
+                **{f'{name}_ms': round(value * 1000, 1)
+                   for name, value in timings.items()},
+            }, ensure_ascii=False))
+        return response
+
+    def get_timings(self, request, timer, started, finished):
+        performance = request.performance
+        timings = {'db': timer.duration}
+        if 'view_started' in performance:
+            view_finished = performance['render_started'] or finished
+            timings['view'] = view_finished - performance['view_started']
+        if 'render_finished' in performance:
+            timings['render'] = (
+                performance['render_finished']
+                - performance['render_started'])
+        timings['total'] = finished - started
+        return timings
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.performance['view'] = get_view_name(view_func, request)
+        request.performance['view_started'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request.performance['render_started'] = time.perf_counter()
+
+        def render_finished(response):
+            request.performance['render_finished'] = time.perf_counter()
+
+        response.add_post_render_callback(render_finished)
+        return response
@@ -1,6 +1,155 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.feed import after
+
+RECIPES_LIMIT_MAX = 50
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class RecipeCursorPagination(BasePagination):
+    """курсорная пагинация по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Курсор хранит ключ последнего рецепта страницы, следующая страница -
+    рецепты строго после него в порядке (-pub_date, -id), поэтому
+    рецепты с одинаковой датой не теряются и не повторяются.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = RECIPES_LIMIT_MAX
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        limit = self.get_page_size(request)
+        page = self.get_page(queryset, self.decode_cursor(request), limit + 1)
+        self.next_position = None
+        if len(page) > limit:
+            self.next_position = self.get_position(page[limit - 1])
+        return page[:limit]
+
+    def get_page(self, queryset, position, limit):
+        """limit рецептов строго после position."""
+        return list(after(queryset, position, 'pk').order_by(
+            '-pub_date', '-pk')[:limit])
+
+    def get_position(self, recipe):
+        """ключ курсора для элемента страницы."""
+        return recipe.pub_date, recipe.pk
+
+    def get_page_size(self, request):
+        try:
+            limit = int(request.query_params.get(
+                self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(limit, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            pub_date, pk = b64decode(
+                cursor.encode(), validate=True).decode().rsplit('|', 1)
+            return datetime.fromisoformat(pub_date), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        pub_date, pk = position
+        cursor = b64encode(f'{pub_date.isoformat()}|{pk}'.encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+
+class RecipePagination(CustomPagination):
+    """постраничная пагинация с переключением на курсорную.
+
+    Курсорный режим включается параметром ?pagination=cursor
+    или атрибутом pagination_mode = 'cursor' у представления. Курсор
+    идет только по дате публикации, поэтому при другой сортировке
+    (?ordering=, ранжирование ?search=) остается постраничный режим.
+    """
+    mode_query_param = 'pagination'
+    ordering_query_params = ('ordering', 'search')
+    cursor_pagination_class = RecipeCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def is_cursor_mode(self, request, view):
+        if any(request.query_params.get(param)
+               for param in self.ordering_query_params):
+            return False
+        mode = request.query_params.get(
+            self.mode_query_param,
+            getattr(view, 'pagination_mode', 'page'),
+        )
+        return mode == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_mode(request, view):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(RecipeCursorPagination):
+    """курсорная пагинация ленты по тому же ключу (pub_date, id).
+
+    Страница собирается слиянием нескольких выборок, поэтому вместо
+    queryset принимает функцию get_keys(position, limit), а элементы
+    страницы - сами ключи.
+    """
+
+    def get_page(self, get_keys, position, limit):
+        return get_keys(position, limit)
+
+    def get_position(self, key):
+        return key
+
+
+def get_recipes_limit(request):
+    """лимит рецептов автора в подписках из recipes_limit."""
+    limit = request.query_params.get('recipes_limit')
+    if limit is None:
+        return RECIPES_LIMIT_MAX
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError(
+            {'recipes_limit': 'Можно ввести только целое число!'})
+    if limit < 0:
+        raise ValidationError(
+            {'recipes_limit': 'Лимит не может быть отрицательным!'})
+    return min(limit, RECIPES_LIMIT_MAX)
@@ -0,0 +1,113 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain
+
+from recipes.changes import RECIPE_INGREDIENTS, get_change_number, get_changes
+from recipes.models import IngredientRecipe
+
+
+def load_recipes(recipe_ids=None):
+    """отсортированные id ингредиентов каждого рецепта."""
+    rows = IngredientRecipe.objects.order_by('recipe_id', 'ingredient_id')
+    if recipe_ids is not None:
+        rows = rows.filter(recipe__in=recipe_ids)
+    recipes = defaultdict(list)
+    for recipe_id, ingredient_id in rows.values_list(
+            'recipe', 'ingredient').iterator():
+        recipes[recipe_id].append(ingredient_id)
+    return recipes
+
+
+class PantryIndex:
+    """Инвертированный индекс ингредиент -> отсортированные id рецептов.
+
+    Строится при первом запросе, дальше по журналу изменений в БД
+    перечитывает только измененные рецепты; при неполном журнале
+    строится заново.
+    Изменения готовятся на копиях, поэтому чтение идет без блокировки.
+    """
+    max_changes = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._number = None
+        self._index = ({}, {})
+
+    def build(self):
+        """загрузка всех связей рецептов и ингредиентов из БД."""
+        recipes = load_recipes()
+        postings = defaultdict(lambda: array('l'))
+        for recipe_id, ingredients in recipes.items():
+            for ingredient_id in ingredients:
+                postings[ingredient_id].append(recipe_id)
+        self._index = (dict(postings), {
+            recipe_id: tuple(ingredients)
+            for recipe_id, ingredients in recipes.items()
+        })
+
+    def apply(self, recipe_ids):
+        """перечитывание измененных и удаленных рецептов."""
+        postings, recipes = self._index
+        recipes = dict(recipes)
+        changed = {}
+        loaded = load_recipes(recipe_ids)
+        for recipe_id in recipe_ids:
+            old = set(recipes.pop(recipe_id, ()))
+            new = loaded.get(recipe_id)
+            if new:
+                recipes[recipe_id] = tuple(new)
+            for ingredient_id in old.symmetric_difference(new or ()):
+                column = changed.get(ingredient_id)
+                if column is None:
+                    column = array('l', postings.get(ingredient_id, ()))
+                    changed[ingredient_id] = column
+                position = bisect_left(column, recipe_id)
+                if ingredient_id in old:
+                    del column[position]
+                else:
+                    column.insert(position, recipe_id)
+        self._index = ({**postings, **changed}, recipes)
+
+    def refresh(self):
+        """применение журнала изменений, если он сдвинулся."""
+        number = get_change_number(RECIPE_INGREDIENTS)
+        if number == self._number:
+            return
+        with self._lock:
+            if self._number is None:
+                self.build()
+            elif number > self._number:
+                changes = get_changes(
+                    RECIPE_INGREDIENTS, self._number, number,
+                    self.max_changes)
+                if changes is None:
+                    self.build()
+                else:
+                    self.apply(changes)
+            self._number = max(number, self._number or 0)
+
+    def rank(self, ingredient_ids, max_missing=None):
+        """рецепты с хотя бы одним из ингредиентов: (id, есть, не хватает).
+
+        Сначала рецепты с большей долей имеющихся ингредиентов, при
+        равенстве - с большим их числом, затем более новые.
+        """
+        self.refresh()
+        postings, recipes = self._index
+        matched = Counter(chain.from_iterable(
+            postings.get(ingredient_id, ())
+            for ingredient_id in set(ingredient_ids)
+        ))
+        results = []
+        for recipe_id, count in matched.items():
+            missing = len(recipes[recipe_id]) - count
+            if max_missing is None or missing <= max_missing:
+                results.append((recipe_id, count, missing))
+        results.sort(key=lambda row: (
+            -row[1] / (row[1] + row[2]), -row[1], -row[0]))
+        return results
+
+
+pantry_index = PantryIndex()
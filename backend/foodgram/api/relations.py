@@ -0,0 +1,118 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+FOLLOWING = 'following'
+
+SOURCES = {
+    FAVORITES: (Favorite, 'recipe_id'),
+    SHOPPING_CART: (ShoppingCart, 'recipe_id'),
+    FOLLOWING: (Follow, 'author_id'),
+}
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+
+
+def get_shared_cache():
+    """общий кэш для множеств, если он задан в настройках."""
+    alias = settings.USER_RELATIONS_CACHE
+    return caches[alias] if alias else None
+
+
+def get_generation_key(user_id, kind):
+    return f'user_relations:{user_id}:{kind}:generation'
+
+
+def get_generation(shared_cache, user_id, kind):
+    """текущее поколение множества, новое при первом обращении."""
+    key = get_generation_key(user_id, kind)
+    generation = shared_cache.get(key)
+    if generation is not None:
+        return generation
+    shared_cache.add(key, uuid4().hex, settings.USER_RELATIONS_CACHE_TIMEOUT)
+    return shared_cache.get(key)
+
+
+def get_cache_key(user_id, kind, generation):
+    return f'user_relations:{user_id}:{kind}:{generation}'
+
+
+class UserRelations:
+    """Множества id избранного, корзины и подписок пользователя.
+
+    Каждое множество загружается одним запросом при первом обращении
+    за запрос, а при заданном USER_RELATIONS_CACHE берется из общего кэша.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._sets = {}
+
+    def get(self, kind):
+        if kind not in self._sets:
+            self._sets[kind] = self.load(kind)
+        return self._sets[kind]
+
+    def load(self, kind):
+        if self.user.is_anonymous:
+            return frozenset()
+        shared_cache = get_shared_cache()
+        ids = key = None
+        if shared_cache:
+            key = get_cache_key(self.user.pk, kind, get_generation(
+                shared_cache, self.user.pk, kind))
+            ids = shared_cache.get(key)
+        if ids is None:
+            model, target_field = SOURCES[kind]
+            ids = frozenset(model.objects.filter(
+                user_id=self.user.pk
+            ).values_list(target_field, flat=True))
+            if shared_cache:
+                shared_cache.set(
+                    key, ids, settings.USER_RELATIONS_CACHE_TIMEOUT)
+        return ids
+
+    @property
+    def favorites(self):
+        return self.get(FAVORITES)
+
+    @property
+    def shopping_cart(self):
+        return self.get(SHOPPING_CART)
+
+    @property
+    def following(self):
+        return self.get(FOLLOWING)
+
+
+def get_relations(request):
+    """множества текущего пользователя, одни на весь запрос."""
+    relations = getattr(request, '_user_relations', None)
+    if relations is None or relations.user != request.user:
+        relations = UserRelations(request.user)
+        request._user_relations = relations
+    return relations
+
+
+def update_relation(instance):
+    """сброс множества пользователя в общем кэше после изменения связи."""
+    reset_relation(instance.user_id, KINDS[type(instance)])
+
+
+def reset_relation(user_id, kind):
+    """смена поколения множества в общем кэше.
+
+    Множество не дописывается и не удаляется: запрос, прочитавший связи
+    до коммита, может положить его в кэш уже после сброса. Такое
+    множество остается под старым поколением, и читатели его не видят.
+    """
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.set(
+            get_generation_key(user_id, kind), uuid4().hex,
+            settings.USER_RELATIONS_CACHE_TIMEOUT)
@@ -1,13 +1,37 @@
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.urls import reverse
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.fields import RecipeImageField
+from api.pagination import get_recipes_limit
+from api.relations import get_relations
+from jobs.models import Job
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.changes import RECIPE_INGREDIENTS, log_changes
+from recipes.images import replace_image
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                             ShoppingCart, Tag, TagRecipe)
+from recipes.similar import mark_stale
 from users.models import Follow, User
 
 
+def get_image_urls(recipe, request):
+    """ссылки на рендишены фото, пока их нет - на исходное фото."""
+    urls = {}
+    for rendition, field in (
+        ('card', recipe.image_card),
+        ('detail', recipe.image_detail),
+        ('original', recipe.image),
+    ):
+        field = field or recipe.image
+        urls[rendition] = (
+            request.build_absolute_uri(field.url) if field else None)
+    return urls
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор тегов."""
     name = serializers.CharField(
@@ -83,8 +107,7 @@ class UserListSerializer(UserSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            user=request.user, author=obj).exists()
+        return obj.id in get_relations(request).following
 
 
 class UserEditSerializer(serializers.ModelSerializer):
@@ -106,6 +129,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         method_name='get_is_favorited')
     is_in_shopping_cart = serializers.SerializerMethodField(
         method_name='get_is_in_shopping_cart')
+    images = serializers.SerializerMethodField(method_name='get_images')
 
     class Meta:
         model = Recipe
@@ -118,13 +142,18 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time'
         )
 
+    def get_images(self, obj):
+        """ссылки на рендишены фото."""
+        return get_image_urls(obj, self.context.get('request'))
+
     def get_ingredients(self, obj):
         """метод отбражения ингредиентов в рецепте."""
-        ingredients = IngredientRecipe.objects.filter(recipe=obj)
+        ingredients = obj.ingredientrecipe_set.all()
         return IngredientRecipeSerializer(ingredients, many=True).data
 
     def get_is_favorited(self, obj):
@@ -132,18 +161,23 @@ class RecipeSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        return Favorite.objects.filter(
-            user=request.user, recipe_id=obj
-        ).exists()
+        return obj.id in get_relations(request).favorites
 
     def get_is_in_shopping_cart(self, obj):
         """метод добавления в корзину покупок."""
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        return ShoppingCart.objects.filter(
-            user=request.user, recipe_id=obj
-        ).exists()
+        return obj.id in get_relations(request).shopping_cart
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    """рецепт с числом имеющихся и недостающих ингредиентов."""
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('matched', 'missing')
 
 
 class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
@@ -153,7 +187,7 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True,
     )
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = RecipeImageField(max_length=None, use_url=True)
 
     class Meta:
         model = Recipe
@@ -169,15 +203,13 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError(
-                    'Ингредиент должен быть уникальным!'
-                )
-            ingredients_list.append(ingredient_id)
+        ingredient_ids = [
+            ingredient['id'] for ingredient in data.get('ingredients', ())
+        ]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Ингредиент должен быть уникальным!'
+            )
         return data
 
     def validate_tags(self, value):
@@ -186,31 +218,79 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         if not tags:
             raise serializers.ValidationError(
                 'Нужно выбрать хотя бы один тег!')
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise serializers.ValidationError(
-                    'Теги должны быть уникальными!')
-            tags_list.append(tag)
+        if len(set(tags)) != len(tags):
+            raise serializers.ValidationError(
+                'Теги должны быть уникальными!')
         return value
 
     def create_ingredients(self, ingredients, recipe):
         """создание ингредиентов в рецепте."""
-        for ingredient in ingredients:
-            IngredientRecipe.objects.bulk_create([
-                IngredientRecipe(
-                    recipe=recipe,
-                    ingredient_id=ingredient.get('id'),
-                    amount=ingredient.get('amount'), )])
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient.get('id'),
+                amount=ingredient.get('amount'),
+            )
+            for ingredient in ingredients
+        )
 
     def create_tags(self, tags, recipe):
         """создание тегов в рецепте."""
-        for tag in tags:
-            TagRecipe.objects.bulk_create([
-                TagRecipe(recipe=recipe, tag=tag)])
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag=tag) for tag in tags)
+
+    def update_ingredients(self, ingredients, recipe):
+        """изменение только тех ингредиентов рецепта, что поменялись."""
+        amounts = {
+            ingredient.get('id'): ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        existing = {
+            item.ingredient_id: item
+            for item in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        IngredientRecipe.objects.filter(
+            recipe=recipe,
+            ingredient_id__in=existing.keys() - amounts.keys(),
+        ).delete()
+        changed = []
+        for ingredient_id, item in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(
+            [
+                ingredient for ingredient in ingredients
+                if ingredient.get('id') not in existing
+            ],
+            recipe,
+        )
+        touched = (
+            existing.keys() ^ amounts.keys()
+            | {item.ingredient_id for item in changed}
+        )
+        if touched:
+            mark_stale([recipe.pk])
+            transaction.on_commit(
+                lambda: log_changes(RECIPE_INGREDIENTS, [recipe.pk]))
+            rebuild_cart_totals(
+                users=ShoppingCart.objects.filter(
+                    recipe=recipe).values('user'),
+                ingredients=touched,
+            )
+
+    def update_tags(self, tags, recipe):
+        """изменение только тех тегов рецепта, что поменялись."""
+        tags = set(tags)
+        existing = set(recipe.tags.all())
+        TagRecipe.objects.filter(
+            recipe=recipe, tag__in=existing - tags).delete()
+        self.create_tags(tags - existing, recipe)
 
     def validate_ingredients(self, ingredients):
-        """валидация количества ингредиентов."""
+        """валидация количества и существования ингредиентов."""
         if not ingredients:
             raise serializers.ValidationError(
                 'Нужен минимум 1 ингредиент в рецепте!')
@@ -225,6 +305,14 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
             if not int(ingredient.get('amount')):
                 raise serializers.ValidationError(
                     'Можно ввести только число!')
+        ingredient_ids = {ingredient.get('id') for ingredient in ingredients}
+        found = set(Ingredient.objects.filter(
+            id__in=ingredient_ids).values_list('id', flat=True))
+        if found != ingredient_ids:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(map(str, sorted(ingredient_ids - found)))}!'
+            )
         return ingredients
 
     def validate_cooking_time(self, cooking_time):
@@ -237,6 +325,7 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
                 'Можно ввести только число!')
         return cooking_time
 
+    @transaction.atomic
     def create(self, validated_data):
         """создание рецепта."""
         ingredients = validated_data.pop('ingredients')
@@ -244,26 +333,39 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         author = self.context.get('request').user
         recipe = Recipe.objects.create(author=author, **validated_data)
         self.create_ingredients(ingredients, recipe)
+        transaction.on_commit(
+            lambda: log_changes(RECIPE_INGREDIENTS, [recipe.pk]))
         self.create_tags(tags, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """редактирование рецепта."""
-        TagRecipe.objects.filter(recipe=instance).delete()
-        IngredientRecipe.objects.filter(recipe=instance).delete()
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        self.create_ingredients(ingredients, instance)
-        self.create_tags(tags, instance)
+        self.update_ingredients(ingredients, instance)
+        self.update_tags(tags, instance)
         instance.name = validated_data.pop('name')
         instance.text = validated_data.pop('text')
-        if validated_data.get('image'):
-            instance.image = validated_data.pop('image')
         instance.cooking_time = validated_data.pop('cooking_time')
-        instance.save()
+        update_fields = ['name', 'text', 'cooking_time']
+        if validated_data.get('image'):
+            update_fields += replace_image(
+                instance, validated_data.pop('image'))
+        instance.save(update_fields=update_fields)
         return instance
 
     def to_representation(self, instance):
+        """созданный или измененный рецепт за постоянное число запросов."""
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'ingredientrecipe_set',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient'),
+            ),
+        )
         return RecipeSerializer(instance, context={
             'request': self.context.get('request')
         }).data
@@ -271,10 +373,23 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
 
 class UserFavoriteSerializer(serializers.ModelSerializer):
     """ Сериализатор для отображения избранного. """
+    images = serializers.SerializerMethodField(method_name='get_images')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
+
+    def get_images(self, obj):
+        """ссылки на рендишены фото."""
+        return get_image_urls(obj, self.context.get('request'))
+
+
+class SimilarRecipeSerializer(UserFavoriteSerializer):
+    """похожий рецепт со степенью сходства."""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(UserFavoriteSerializer.Meta):
+        fields = UserFavoriteSerializer.Meta.fields + ('similarity', )
 
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
@@ -333,24 +448,25 @@ class UserFollowSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            user=request.user, author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in get_relations(request).following
 
     def get_recipes(self, obj):
         """получение рецептов автора."""
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        recipes = Recipe.objects.filter(author=obj)
-        limit = request.query_params.get('recipes_limit')
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()[:get_recipes_limit(request)]
         return UserFavoriteSerializer(
             recipes, many=True, context={'request': request}).data
 
     def get_recipes_count(self, obj):
         """количество рецептов в подписке."""
-        return Recipe.objects.filter(author=obj).count()
+        return obj.recipes_count
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -384,3 +500,42 @@ class FollowSerializer(serializers.ModelSerializer):
         return UserFollowSerializer(instance.author, context={
             'request': self.context.get('request')
         }).data
+
+
+class BatchIdsSerializer(serializers.Serializer):
+    """Список id для массовых операций."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
+class PantrySerializer(serializers.Serializer):
+    """Имеющиеся ингредиенты для подбора рецептов."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор статуса фоновой задачи."""
+    result = serializers.SerializerMethodField(method_name='get_result')
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'result',
+            'created', 'finished_at'
+        )
+
+    def get_result(self, obj):
+        """результат задачи, файлы - ссылками на скачивание владельцем."""
+        result = obj.result_data
+        if result and 'file' in result:
+            result['file'] = self.context.get('request').build_absolute_uri(
+                reverse('api:jobs-file', kwargs={'pk': obj.pk}))
+        return result
@@ -0,0 +1,190 @@
+import csv
+import hashlib
+import io
+import logging
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from recipes.models import ShoppingCartIngredient
+
+logger = logging.getLogger(__name__)
+
+TITLE = 'Список покупок'
+FIELDS = (
+    'ingredient__id', 'ingredient__name', 'ingredient__measurement_unit',
+    'amount'
+)
+EXPORTS_DIR = 'shopping_lists'
+
+
+def get_shopping_list(user):
+    """готовые итоги по ингредиентам корзины, без суммирования рецептов."""
+    return ShoppingCartIngredient.objects.filter(user=user).values(
+        *FIELDS).order_by('ingredient__name', 'ingredient__id')
+
+
+def hash_rows(rows, file_format):
+    """хэш строк списка покупок (FIELDS) вместе с форматом.
+
+    В хэш входят название и единица измерения: после их правки
+    клиент получает новый текст, а не 304.
+    """
+    digest = hashlib.sha1(file_format.encode())
+    for row in rows:
+        digest.update(('\t'.join(map(str, row)) + '\n').encode())
+    return digest.hexdigest()
+
+
+def get_etag(user, file_format):
+    """ETag по содержимому корзины и формату файла."""
+    rows = get_shopping_list(user).values_list(*FIELDS)
+    return hash_rows(rows.iterator(), file_format)
+
+
+def render_txt(rows):
+    """построчная выгрузка в текст."""
+    yield f'{TITLE}:\n'
+    for row in rows:
+        yield (
+            f"{row['ingredient__name']} - "
+            f"{row['amount']} {row['ingredient__measurement_unit']}\n"
+        )
+
+
+class Echo:
+    """буфер для csv.writer, отдающий строку без накопления."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    """построчная выгрузка в CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Ингредиент', 'Количество', 'Единица измерения'])
+    for row in rows:
+        yield writer.writerow([
+            row['ingredient__name'],
+            row['amount'],
+            row['ingredient__measurement_unit'],
+        ])
+
+
+def get_pdf_font():
+    """шрифт с кириллицей, если он есть в системе.
+
+    Шрифт регистрируется под именем по пути к файлу, поэтому смена
+    SHOPPING_LIST_FONT не отдает ранее загруженный шрифт.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    path = settings.SHOPPING_LIST_FONT
+    font_name = (
+        f'ShoppingListFont-{hashlib.sha1(path.encode()).hexdigest()[:8]}')
+    if font_name in pdfmetrics.getRegisteredFontNames():
+        return font_name
+    try:
+        pdfmetrics.registerFont(TTFont(font_name, path))
+    except Exception:
+        logger.exception(
+            'Нет шрифта SHOPPING_LIST_FONT=%s, PDF без кириллицы', path)
+        return 'Helvetica'
+    return font_name
+
+
+def render_pdf(rows):
+    """выгрузка в PDF.
+
+    Строки берутся из итератора по одной, но документ reportlab
+    собирает целиком и отдает после сохранения.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    width, height = A4
+    margin, line_height = 50, 18
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(TITLE)
+    pdf.setFont(font, 16)
+    pdf.drawString(margin, height - margin, f'{TITLE}:')
+    pdf.setFont(font, 12)
+    position = height - margin - 2 * line_height
+    for number, row in enumerate(rows, start=1):
+        if position < margin:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            position = height - margin
+        pdf.drawString(
+            margin, position,
+            f"{number}. {row['ingredient__name']} - "
+            f"{row['amount']} {row['ingredient__measurement_unit']}"
+        )
+        position -= line_height
+    pdf.save()
+    yield buffer.getvalue()
+
+
+FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
+
+
+def get_export_storage():
+    """хранилище выгрузок вне MEDIA: файлы отдаются только владельцу."""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+def delete_expired_exports(user_id=None):
+    """удаление выгрузок старше SHOPPING_LIST_EXPORT_TTL.
+
+    Без user_id просматриваются каталоги всех пользователей.
+    """
+    storage = get_export_storage()
+    expired = timezone.now() - timedelta(
+        seconds=settings.SHOPPING_LIST_EXPORT_TTL)
+    if user_id is None:
+        try:
+            directories, _ = storage.listdir(EXPORTS_DIR)
+        except FileNotFoundError:
+            return 0
+    else:
+        directories = [str(user_id)]
+    deleted = 0
+    for directory in directories:
+        directory = f'{EXPORTS_DIR}/{directory}'
+        try:
+            _, files = storage.listdir(directory)
+        except FileNotFoundError:
+            continue
+        for name in files:
+            path = f'{directory}/{name}'
+            if storage.get_modified_time(path) < expired:
+                storage.delete(path)
+                deleted += 1
+    return deleted
+
+
+def export_shopping_list(user, file_format):
+    """сохранение списка покупок в закрытое хранилище, возвращает путь.
+
+    Имя файла случайное, устаревшие выгрузки пользователя удаляются.
+    """
+    render, _ = FORMATS[file_format]
+    content = b''.join(
+        chunk.encode() if isinstance(chunk, str) else chunk
+        for chunk in render(get_shopping_list(user).iterator())
+    )
+    delete_expired_exports(user.pk)
+    return get_export_storage().save(
+        f'{EXPORTS_DIR}/{user.pk}/{uuid4().hex}.{file_format}',
+        ContentFile(content))
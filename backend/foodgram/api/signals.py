@@ -0,0 +1,217 @@
+import time
+
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.relations import update_relation
+from jobs.queue import enqueue
+from recipes.cart_totals import change_cart_totals
+from recipes.changes import (INGREDIENTS, RECIPE_INGREDIENTS, TAGS,
+                             bump_version, log_changes)
+from recipes.feed import followed, unfollowed
+from recipes.images import needs_processing, schedule_processing
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeNeighbour,
+                            ShoppingCart, Tag)
+from recipes.search import remove_from_search_index, update_search_index
+from recipes.similar import mark_stale
+from users.models import Follow, User
+
+
+@receiver(request_started)
+def check_persistent_connections(sender, **kwargs):
+    """проверка соединений, простоявших дольше CONN_HEALTH_CHECK_INTERVAL.
+
+    Аналог CONN_HEALTH_CHECKS из новых версий Django: разорванное
+    соединение закрывается и переоткрывается, а не роняет запрос.
+    Соединение, которым пользовался недавний запрос, не проверяется,
+    чтобы не тратить на каждый запрос лишний обмен с БД.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        settings_dict = connection.settings_dict
+        if (
+            connection.connection is not None
+            and settings_dict.get('CONN_HEALTH_CHECKS')
+            and now - getattr(connection, 'idle_since', 0)
+            >= settings_dict.get('CONN_HEALTH_CHECK_INTERVAL', 0)
+            and not connection.is_usable()
+        ):
+            connection.close()
+
+
+@receiver(request_finished)
+def mark_idle_connections(sender, **kwargs):
+    """время, с которого соединение простаивает между запросами."""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """сброс кэша токена при выходе пользователя.
+
+    Повтор после коммита убирает запись, которую параллельный запрос
+    мог положить в кэш до коммита.
+    """
+    token_cache.invalidate(instance.key)
+    transaction.on_commit(lambda: token_cache.invalidate(instance.key))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """сброс кэша токенов при изменении или блокировке пользователя."""
+    token_cache.invalidate_user(instance.pk)
+    transaction.on_commit(lambda: token_cache.invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """сброс кэша и индекса ингредиентов при изменении справочника."""
+    bump_version(INGREDIENTS)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """сброс кэша тегов при изменении справочника."""
+    bump_version(TAGS)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+def relation_changed(sender, instance, **kwargs):
+    """сброс множества пользователя после коммита."""
+    transaction.on_commit(lambda: update_relation(instance))
+
+
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Follow: (User, 'author_id', 'followers_count'),
+}
+
+
+def change_counter(instance, delta):
+    """атомарное изменение счетчика через F()."""
+    model, relation, field = COUNTERS[type(instance)]
+    queryset = model.objects.filter(pk=getattr(instance, relation))
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    queryset.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Follow)
+def counter_increment(sender, instance, created, **kwargs):
+    """увеличение счетчика при добавлении связи."""
+    if created:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Follow)
+def counter_decrement(sender, instance, **kwargs):
+    """уменьшение счетчика при удалении связи."""
+    change_counter(instance, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    """задача обработки нового фото в одной транзакции с рецептом."""
+    if needs_processing(instance):
+        schedule_processing(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_saved(sender, instance, **kwargs):
+    """переиндексация рецепта после коммита, когда ингредиенты сохранены."""
+    transaction.on_commit(
+        lambda: update_search_index(Recipe.objects.filter(pk=instance.pk)))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(sender, instance, **kwargs):
+    """удаление рецепта из поискового индекса."""
+    remove_from_search_index(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_saved(sender, instance, created, **kwargs):
+    """переиндексация рецептов с измененным ингредиентом в фоне."""
+    if not created:
+        enqueue('recipes.reindex_ingredient', ingredient_id=instance.pk)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_totals_added(sender, instance, created, **kwargs):
+    """прибавление ингредиентов рецепта к итогам корзины."""
+    if created:
+        change_cart_totals(instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_totals_removed(sender, instance, **kwargs):
+    """вычитание ингредиентов рецепта из итогов корзины.
+
+    До удаления, пока ингредиенты рецепта еще есть и при каскадном
+    удалении самого рецепта.
+    """
+    change_cart_totals(instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_feed_saved(sender, instance, created, **kwargs):
+    """раскладка нового рецепта по лентам подписчиков в фоне."""
+    if created:
+        enqueue('recipes.fan_out_recipe', recipe_id=instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def feed_followed(sender, instance, created, **kwargs):
+    """рецепты нового автора в ленту подписчика."""
+    if created:
+        followed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def feed_unfollowed(sender, instance, **kwargs):
+    """рецепты автора из ленты бывшего подписчика."""
+    unfollowed(instance.user_id, [instance.author_id])
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_neighbours_deleted(sender, instance, **kwargs):
+    """рецепты, у которых удаленный был в похожих, пересчитаются."""
+    mark_stale(RecipeNeighbour.objects.filter(
+        neighbour=instance).values('recipe'))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_pantry_deleted(sender, instance, **kwargs):
+    """удаление рецепта из индекса кладовой после коммита."""
+    recipe_id = instance.pk
+    transaction.on_commit(
+        lambda: log_changes(RECIPE_INGREDIENTS, [recipe_id]))
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_pantry_deleted(sender, **kwargs):
+    """ингредиент удален вместе со связями, индекс строится заново."""
+    transaction.on_commit(lambda: log_changes(RECIPE_INGREDIENTS))
@@ -0,0 +1,13 @@
+from django.contrib.auth import get_user_model
+
+from api.shopping_list import export_shopping_list
+from jobs.queue import task
+
+User = get_user_model()
+
+
+@task('api.export_shopping_list')
+def export_shopping_list_task(user_id, file_format):
+    """выгрузка списка покупок в файл хранилища."""
+    user = User.objects.get(pk=user_id)
+    return {'file': export_shopping_list(user, file_format)}
@@ -0,0 +1,33 @@
+from recipes.models import IngredientRecipe, Recipe, TagRecipe
+from users.models import User
+
+
+def create_user(name):
+    """пользователь с почтой и паролем по имени."""
+    return User.objects.create_user(
+        username=name, email=f'{name}@test.ru', password='pass',
+        first_name=name, last_name=name)
+
+
+def create_recipes(author, count, tags=(), ingredients=()):
+    """рецепты автора; с tags - по тегу, с ingredients - по три
+    ингредиента с количествами 1, 2 и 3."""
+    recipes = []
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            author=author, name=f'{author.username}-{number}', text='text',
+            image='recipes/images/test.jpg', cooking_time=5)
+        if tags:
+            TagRecipe.objects.create(
+                recipe=recipe, tag=tags[number % len(tags)])
+        if ingredients:
+            IngredientRecipe.objects.bulk_create([
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (number + shift) % len(ingredients)],
+                    amount=shift + 1)
+                for shift in range(3)
+            ])
+        recipes.append(recipe)
+    return recipes
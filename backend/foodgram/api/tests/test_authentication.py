@@ -0,0 +1,146 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase
+
+from api.authentication import (CachedTokenAuthentication, get_cache_key,
+                                token_cache)
+from api.tests.factories import create_user
+
+BACKENDS = {'local': None, 'shared': 'default'}
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    """Кэш токенов в памяти процесса и в общем кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        user, _ = self.authentication.authenticate_credentials(
+            self.token.key)
+        return user
+
+    def for_each_backend(self, check):
+        """проверка с кэшем процесса и с общим кэшем."""
+        for name, alias in BACKENDS.items():
+            with self.subTest(cache=name), override_settings(
+                    TOKEN_AUTH_CACHE=alias):
+                cache.clear()
+                token_cache.clear()
+                check()
+
+    def test_cache_hit_does_not_query(self):
+        def check():
+            with self.assertNumQueries(1):
+                self.authenticate()
+            with self.assertNumQueries(0):
+                user = self.authenticate()
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.email, self.user.email)
+
+        self.for_each_backend(check)
+
+    def test_cached_user_defers_only_password(self):
+        def check():
+            self.authenticate()
+            user = self.authenticate()
+            with self.assertNumQueries(0):
+                self.assertEqual(user.first_name, self.user.first_name)
+                self.assertEqual(user.last_name, self.user.last_name)
+            self.assertEqual(user.get_deferred_fields(), {'password'})
+            with self.assertNumQueries(1):
+                self.assertEqual(user.password, self.user.password)
+
+        self.for_each_backend(check)
+
+    def test_full_save_does_not_load_password(self):
+        def check():
+            self.authenticate()
+            user = self.authenticate()
+            user.first_name = 'Читатель'
+            with CaptureQueriesContext(connection) as queries:
+                user.save()
+            self.assertFalse([
+                query['sql'] for query in queries.captured_queries
+                if '"password"' in query['sql']
+            ])
+            self.assertEqual(user.get_deferred_fields(), {'password'})
+
+        self.for_each_backend(check)
+
+    def test_me_with_warm_cache(self):
+        def check():
+            self.client.credentials(
+                HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            self.client.get('/api/users/me/')
+            with self.assertNumQueries(1):
+                response = self.client.get('/api/users/me/')
+            self.assertEqual(response.data['email'], self.user.email)
+            self.assertEqual(
+                response.data['first_name'], self.user.first_name)
+
+        self.for_each_backend(check)
+
+    def test_shared_cache_has_no_password(self):
+        with override_settings(TOKEN_AUTH_CACHE='default'):
+            self.authenticate()
+        values = cache.get(get_cache_key(self.token.key))
+        self.assertIsNotNone(values)
+        self.assertNotIn(self.user.password, values)
+
+    def test_token_delete(self):
+        def check():
+            self.authenticate()
+            Token.objects.filter(pk=self.token.pk).delete()
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate()
+            self.token = Token.objects.create(user=self.user)
+
+        self.for_each_backend(check)
+
+    def test_user_deactivation(self):
+        def check():
+            self.authenticate()
+            self.user.is_active = False
+            self.user.save()
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate()
+            self.user.is_active = True
+            self.user.save()
+
+        self.for_each_backend(check)
+
+    def test_password_change(self):
+        def check():
+            self.authenticate()
+            self.user.set_password('new-pass')
+            self.user.save()
+            with self.assertNumQueries(1):
+                self.authenticate()
+
+        self.for_each_backend(check)
+
+    def test_logout(self):
+        def check():
+            self.client.credentials(
+                HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            self.assertEqual(
+                self.client.get('/api/users/me/').status_code, 200)
+            response = self.client.post('/api/auth/token/logout/')
+            self.assertEqual(response.status_code, 204)
+            self.assertEqual(
+                self.client.get('/api/users/me/').status_code, 401)
+            self.token = Token.objects.create(user=self.user)
+
+        self.for_each_backend(check)
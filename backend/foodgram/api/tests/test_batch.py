@@ -0,0 +1,175 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_recipes, create_user
+from recipes.models import (Favorite, Ingredient, Recipe,
+                            ShoppingCartIngredient)
+from users.models import Follow, User
+
+
+class ShoppingCartBatchTest(APITestCase):
+    """Массовые изменения корзины вместе с одиночными."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        ingredients = [
+            Ingredient.objects.create(name=f'ing{i}', measurement_unit='g')
+            for i in range(3)
+        ]
+        cls.recipes = create_recipes(
+            create_user('author'), 2, ingredients=ingredients)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def batch(self, method, recipes):
+        response = getattr(self.client, method)(
+            '/api/recipes/shopping_cart/',
+            {'ids': [recipe.pk for recipe in recipes]}, format='json')
+        return [item['status'] for item in response.data['results']]
+
+    def totals(self):
+        return dict(ShoppingCartIngredient.objects.filter(
+            user=self.user).values_list('ingredient', 'amount'))
+
+    def test_single_and_batch_do_not_double_count(self):
+        self.client.post(f'/api/recipes/{self.recipes[0].pk}/shopping_cart/')
+        self.assertEqual(
+            self.batch('post', self.recipes), ['exists', 'created'])
+        # у двух рецептов общие ингредиенты: 1+3, 2+1, 3+2
+        self.assertEqual(sorted(self.totals().values()), [3, 4, 5])
+        self.assertEqual(
+            list(Recipe.objects.order_by('pk').values_list(
+                'in_carts_count', flat=True)), [1, 1])
+        self.assertEqual(
+            self.batch('delete', self.recipes), ['deleted', 'deleted'])
+        self.assertEqual(self.totals(), {})
+        self.assertEqual(
+            self.batch('delete', self.recipes), ['not_linked', 'not_linked'])
+        self.assertEqual(
+            list(Recipe.objects.values_list('in_carts_count', flat=True)),
+            [0, 0])
+
+
+class BatchRelationTest(APITestCase):
+    """Массовое избранное и подписки: статусы, проверка ids, запросы."""
+
+    favorite_url = '/api/recipes/favorite/'
+    subscribe_url = '/api/users/subscribe/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{i}') for i in range(5)]
+        cls.recipes = create_recipes(cls.authors[0], 5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def batch(self, method, url, ids, status=200):
+        response = getattr(self.client, method)(
+            url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status, response.data)
+        return response.data
+
+    def statuses(self, method, url, ids):
+        return [
+            (item['id'], item['status'])
+            for item in self.batch(method, url, ids)['results']
+        ]
+
+    def test_favorite_create_and_delete(self):
+        first, second = (recipe.pk for recipe in self.recipes[:2])
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        self.assertEqual(
+            self.statuses('post', self.favorite_url, [first, second]),
+            [(first, 'exists'), (second, 'created')])
+        self.assertCountEqual(
+            Favorite.objects.filter(user=self.user).values_list(
+                'recipe', flat=True), [first, second])
+        self.assertEqual(
+            Recipe.objects.get(pk=second).favorites_count, 1)
+        self.assertEqual(
+            self.statuses('delete', self.favorite_url, [second]),
+            [(second, 'deleted')])
+        self.assertEqual(
+            self.statuses('delete', self.favorite_url, [second]),
+            [(second, 'not_linked')])
+        self.assertEqual(
+            Recipe.objects.get(pk=second).favorites_count, 0)
+
+    def test_follow_create_and_delete(self):
+        ids = [author.pk for author in self.authors[:2]]
+        self.assertEqual(
+            self.statuses('post', self.subscribe_url, ids),
+            [(pk, 'created') for pk in ids])
+        self.assertCountEqual(
+            Follow.objects.filter(user=self.user).values_list(
+                'author', flat=True), ids)
+        self.assertEqual(
+            User.objects.get(pk=ids[0]).followers_count, 1)
+        self.assertEqual(
+            self.statuses('post', self.subscribe_url, ids),
+            [(pk, 'exists') for pk in ids])
+        self.assertEqual(
+            self.statuses('delete', self.subscribe_url, ids),
+            [(pk, 'deleted') for pk in ids])
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            User.objects.get(pk=ids[0]).followers_count, 0)
+
+    def test_self_follow_is_not_allowed(self):
+        author = self.authors[0].pk
+        self.assertEqual(
+            self.statuses('post', self.subscribe_url, [self.user.pk, author]),
+            [(self.user.pk, 'not_allowed'), (author, 'created')])
+        self.assertFalse(
+            Follow.objects.filter(user=self.user, author=self.user).exists())
+
+    def test_unknown_ids_are_not_found(self):
+        missing = Recipe.objects.order_by('-pk').first().pk + 1
+        recipe = self.recipes[0].pk
+        self.assertEqual(
+            self.statuses('post', self.favorite_url, [missing, recipe]),
+            [(missing, 'not_found'), (recipe, 'created')])
+        self.assertEqual(
+            self.statuses('delete', self.favorite_url, [missing]),
+            [(missing, 'not_found')])
+
+    def test_duplicate_ids_are_collapsed(self):
+        first, second = (recipe.pk for recipe in self.recipes[:2])
+        self.assertEqual(
+            self.statuses('post', self.favorite_url, [first, second, first]),
+            [(first, 'created'), (second, 'created')])
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            self.statuses('delete', self.favorite_url, [second, second]),
+            [(second, 'deleted')])
+
+    def test_invalid_ids(self):
+        for ids in ([], 'abc', ['abc'], [0], 5, list(range(1, 102))):
+            with self.subTest(ids=ids):
+                data = self.batch('post', self.favorite_url, ids, status=400)
+                self.assertIn('ids', data)
+        response = self.client.post(self.favorite_url, {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Favorite.objects.exists())
+
+    def count_queries(self, method, url, ids):
+        with CaptureQueriesContext(connection) as context:
+            self.batch(method, url, ids)
+        return len(context.captured_queries)
+
+    def test_query_budget_does_not_grow_with_batch(self):
+        recipes = [recipe.pk for recipe in self.recipes]
+        authors = [author.pk for author in self.authors]
+        for method in ('post', 'delete'):
+            for url, ids in ((self.favorite_url, recipes),
+                             (self.subscribe_url, authors)):
+                with self.subTest(method=method, url=url):
+                    self.assertEqual(
+                        self.count_queries(method, url, ids[:1]),
+                        self.count_queries(method, url, ids[1:]))
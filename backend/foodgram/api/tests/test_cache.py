@@ -0,0 +1,62 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.changes import TAGS, version_key
+from recipes.models import CatalogueVersion, Ingredient, Tag
+
+
+def bump_in_other_process(name):
+    """смена версии так, как ее видит процесс, не получавший сигналов:
+    запись в БД, видимая после истечения версии в кэше."""
+    CatalogueVersion.objects.filter(name=name).update(version=uuid4())
+    cache.delete(version_key(name))
+
+
+class VersionedCacheTest(APITestCase):
+    """Кэш ответов справочников по версии справочника."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Соль', measurement_unit='г'),
+            Ingredient(name='Сахар', measurement_unit='г'),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeated_list_does_not_query(self):
+        first = self.client.get('/api/tags/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/tags/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_not_modified(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_in_other_process_invalidates(self):
+        first = self.client.get('/api/tags/')
+        Tag.objects.bulk_create([
+            Tag(name='Обед', color='#49B64E', slug='dinner')])
+        bump_in_other_process(TAGS)
+        response = self.client.get('/api/tags/')
+        self.assertEqual(len(response.data), 2)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        response = self.client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_key_ignores_case_and_unrelated_params(self):
+        first = self.client.get('/api/ingredients/?name=Сол')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/ingredients/?_=1&name=сол')
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(
+            [item['name'] for item in second.data], ['Соль'])
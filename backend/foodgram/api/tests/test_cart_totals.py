@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_recipes, create_user
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.models import (Ingredient, Recipe, ShoppingCartIngredient,
+                            Tag)
+
+
+class CartTotalsTest(APITestCase):
+    """Итоги корзины по ингредиентам следуют за корзиной и рецептами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ing{i}', measurement_unit='g')
+            for i in range(4)
+        ]
+        cls.tag = Tag.objects.create(
+            name='Обед', color='#49B64E', slug='dinner')
+        # первый рецепт: ing0 - 1, ing1 - 2, ing2 - 3;
+        # второй: ing1 - 1, ing2 - 2, ing3 - 3
+        cls.recipes = create_recipes(
+            cls.author, 2, ingredients=cls.ingredients)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def add(self, recipe):
+        response = self.client.post(
+            f'/api/recipes/{recipe.pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+
+    def totals(self):
+        """итоги корзины по номеру ингредиента."""
+        numbers = {
+            ingredient.pk: number
+            for number, ingredient in enumerate(self.ingredients)
+        }
+        return {
+            numbers[pk]: amount
+            for pk, amount in ShoppingCartIngredient.objects.filter(
+                user=self.user).values_list('ingredient', 'amount')
+        }
+
+    def test_overlapping_recipes_sum(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        self.assertEqual(self.totals(), {0: 1, 1: 3, 2: 5, 3: 3})
+
+    def test_remove_recipe(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        response = self.client.delete(
+            f'/api/recipes/{self.recipes[0].pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.totals(), {1: 1, 2: 2, 3: 3})
+
+    def test_deleted_recipe_leaves_cart(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        Recipe.objects.filter(pk=self.recipes[1].pk).delete()
+        self.assertEqual(self.totals(), {0: 1, 1: 2, 2: 3})
+
+    def test_recipe_edit_propagates(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipes[1].pk}/',
+            {
+                'ingredients': [
+                    {'id': self.ingredients[1].pk, 'amount': 4},
+                    {'id': self.ingredients[3].pk, 'amount': 3},
+                ],
+                'tags': [self.tag.pk],
+                'name': 'name',
+                'text': 'text',
+                'cooking_time': 5,
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(), {0: 1, 1: 6, 2: 3, 3: 3})
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        ShoppingCartIngredient.objects.filter(
+            user=self.user, ingredient=self.ingredients[0]).update(amount=7)
+        ShoppingCartIngredient.objects.filter(
+            user=self.user, ingredient=self.ingredients[3]).delete()
+        self.assertEqual(rebuild_cart_totals(fix=False), 2)
+        out = StringIO()
+        call_command('reconcile_cart_totals', '--check', stdout=out)
+        self.assertIn('расхождений 2', out.getvalue())
+        self.assertEqual(self.totals(), {0: 7, 1: 3, 2: 5})
+        out = StringIO()
+        call_command('reconcile_cart_totals', stdout=out)
+        self.assertIn('расхождений 2', out.getvalue())
+        self.assertEqual(self.totals(), {0: 1, 1: 3, 2: 5, 3: 3})
+        self.assertEqual(rebuild_cart_totals(fix=False), 0)
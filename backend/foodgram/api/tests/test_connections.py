@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.test import SimpleTestCase
+
+
+class ConnectionHealthCheckTest(SimpleTestCase):
+    """Проверка переиспользуемого соединения только после простоя."""
+    databases = {'default'}
+
+    def setUp(self):
+        connection.ensure_connection()
+        settings_dict = mock.patch.dict(connection.settings_dict, {
+            'CONN_HEALTH_CHECKS': True, 'CONN_HEALTH_CHECK_INTERVAL': 10})
+        settings_dict.start()
+        self.addCleanup(settings_dict.stop)
+        is_usable = mock.patch.object(
+            connection, 'is_usable', return_value=True)
+        self.is_usable = is_usable.start()
+        self.addCleanup(is_usable.stop)
+
+    def start_request_at(self, moment):
+        with mock.patch('api.signals.time.monotonic', return_value=moment):
+            request_started.send(sender=None)
+
+    def finish_request_at(self, moment):
+        with mock.patch('api.signals.time.monotonic', return_value=moment):
+            request_finished.send(sender=None)
+
+    def test_recently_used_connection_is_not_pinged(self):
+        self.finish_request_at(100)
+        self.start_request_at(105)
+        self.is_usable.assert_not_called()
+
+    def test_idle_connection_is_pinged(self):
+        self.finish_request_at(100)
+        self.start_request_at(111)
+        self.is_usable.assert_called_once()
+
+    def test_broken_connection_is_closed(self):
+        self.finish_request_at(100)
+        self.is_usable.return_value = False
+        with mock.patch.object(connection, 'close') as close:
+            self.start_request_at(200)
+        close.assert_called_once()
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_recipes, create_user
+from recipes.models import Recipe
+from users.models import User
+
+
+class CountersTest(APITestCase):
+    """Счетчики следуют за связями и не теряются при save()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipe = create_recipes(cls.author, 1)[0]
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        return {
+            'favorites_count': recipe.favorites_count,
+            'in_carts_count': recipe.in_carts_count,
+            'recipes_count': author.recipes_count,
+            'followers_count': author.followers_count,
+        }
+
+    def assert_counters(self, **expected):
+        counters = self.counters()
+        self.assertEqual(
+            {name: counters[name] for name in expected}, expected)
+
+    def test_favorite_and_cart(self):
+        for url, field in (
+            (f'/api/recipes/{self.recipe.pk}/favorite/', 'favorites_count'),
+            (f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+             'in_carts_count'),
+        ):
+            with self.subTest(field=field):
+                self.assertEqual(self.client.post(url).status_code, 201)
+                self.assert_counters(**{field: 1})
+                self.assertEqual(self.client.delete(url).status_code, 204)
+                self.assert_counters(**{field: 0})
+
+    def test_follow(self):
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assert_counters(followers_count=1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assert_counters(followers_count=0)
+
+    def test_recipe_create_and_delete(self):
+        self.assert_counters(recipes_count=1)
+        recipe = create_recipes(self.author, 1)[0]
+        self.assert_counters(recipes_count=2)
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_counters(recipes_count=1)
+
+    def test_save_keeps_concurrent_increment(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        # счетчики меняет другой запрос после чтения объектов
+        self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        recipe.name = 'Новое название'
+        recipe.save()
+        author.first_name = 'Автор'
+        author.save()
+        self.assert_counters(favorites_count=1, followers_count=1)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).name, 'Новое название')
+
+    def test_recount_fixes_drift(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            favorites_count=5, in_carts_count=3)
+        User.objects.filter(pk=self.author.pk).update(
+            recipes_count=0, followers_count=2)
+        out = StringIO()
+        call_command('recount_counters', '--check', stdout=out)
+        self.assertIn('recipes.Recipe.favorites_count: расхождений 1',
+                      out.getvalue())
+        self.assert_counters(favorites_count=5)
+        call_command('recount_counters', stdout=StringIO())
+        self.assert_counters(
+            favorites_count=0, in_carts_count=0, recipes_count=1,
+            followers_count=0)
+        out = StringIO()
+        call_command('recount_counters', '--check', stdout=out)
+        self.assertNotIn('расхождений 1', out.getvalue())
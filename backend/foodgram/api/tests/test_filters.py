@@ -0,0 +1,87 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from api.filters import get_tag_ids
+from api.tests.factories import create_recipes, create_user
+from recipes.changes import TAGS, version_key
+from recipes.models import CatalogueVersion, Tag, TagRecipe
+
+
+class TagIdsTest(TestCase):
+    """slug -> id тегов для фильтра ?tags=."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_known_slugs_do_not_query(self):
+        get_tag_ids(['breakfast'])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_tag_ids(['breakfast']), [self.breakfast.pk])
+
+    def test_tag_created_before_version_change(self):
+        get_tag_ids(['breakfast'])
+        Tag.objects.bulk_create([
+            Tag(name='Обед', color='#49B64E', slug='dinner')])
+        dinner = Tag.objects.get(slug='dinner')
+        self.assertEqual(
+            get_tag_ids(['breakfast', 'dinner']),
+            [self.breakfast.pk, dinner.pk])
+
+    def test_tag_renamed_in_other_process(self):
+        get_tag_ids(['breakfast'])
+        Tag.objects.filter(pk=self.breakfast.pk).update(slug='morning')
+        CatalogueVersion.objects.filter(name=TAGS).update(version=uuid4())
+        cache.delete(version_key(TAGS))
+        self.assertEqual(get_tag_ids(['breakfast']), [])
+        self.assertEqual(get_tag_ids(['morning']), [self.breakfast.pk])
+
+
+class TagFilterTest(APITestCase):
+    """Фильтр ?tags= отдает рецепт с несколькими тегами один раз."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(name=f'tag{i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        author = create_user('author')
+        cls.both, cls.first, cls.untagged = create_recipes(author, 3)
+        TagRecipe.objects.bulk_create([
+            TagRecipe(recipe=cls.both, tag=cls.tags[0]),
+            TagRecipe(recipe=cls.both, tag=cls.tags[1]),
+            TagRecipe(recipe=cls.first, tag=cls.tags[0]),
+            TagRecipe(recipe=cls.untagged, tag=cls.tags[2]),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recipe_with_both_tags_appears_once(self):
+        response = self.client.get('/api/recipes/?tags=tag0&tags=tag1')
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertCountEqual(ids, [self.both.pk, self.first.pk])
+        self.assertEqual(response.data['count'], len(ids))
+
+    def test_count_matches_pages(self):
+        ids = []
+        for page in (1, 2):
+            response = self.client.get(
+                f'/api/recipes/?tags=tag0&tags=tag1&limit=1&page={page}')
+            self.assertEqual(response.data['count'], 2)
+            ids += [recipe['id'] for recipe in response.data['results']]
+        self.assertCountEqual(ids, [self.both.pk, self.first.pk])
+
+    def test_unknown_tag(self):
+        response = self.client.get('/api/recipes/?tags=missing')
+        self.assertEqual(response.data['count'], 0)
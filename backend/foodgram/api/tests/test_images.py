@@ -0,0 +1,85 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITransactionTestCase
+
+from api.tests.factories import create_user
+from recipes.images import (EXTENSIONS, FORMAT, pick_format,
+                            process_recipe_image, replace_image)
+from recipes.models import Recipe
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def photo(name, mode='RGB'):
+    """маленькое PNG-фото в хранилище."""
+    buffer = io.BytesIO()
+    Image.new(mode, (8, 8), 'red').save(buffer, 'PNG')
+    return default_storage.save(
+        f'recipes/images/{name}.png', ContentFile(buffer.getvalue()))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageTest(APITransactionTestCase):
+    """замена фото рецепта и фоновые рендишены; вне транзакции теста
+    on_commit срабатывает сразу."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            author=create_user('author'), name='Суп', text='text',
+            image=photo('first'), cooking_time=5)
+        process_recipe_image(self.recipe.pk)
+        self.recipe.refresh_from_db()
+
+    def names(self, recipe):
+        return [recipe.image.name, recipe.image_card.name,
+                recipe.image_detail.name]
+
+    def test_replace_deletes_old_files(self):
+        old_names = self.names(self.recipe)
+        self.recipe.save(update_fields=replace_image(
+            self.recipe, photo('second')))
+        process_recipe_image(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        for name in old_names:
+            self.assertFalse(default_storage.exists(name), name)
+        for name in self.names(self.recipe):
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_full_save_keeps_job_renditions(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        stale.image_card = stale.image_detail = ''
+        stale.name = 'Борщ'
+        stale.save()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.name, 'Борщ')
+        self.assertEqual(self.names(recipe), self.names(self.recipe))
+
+    def test_renditions_use_supported_format(self):
+        for name in self.names(self.recipe):
+            self.assertTrue(name.endswith(f'.{EXTENSIONS[FORMAT]}'), name)
+            with default_storage.open(name) as f:
+                self.assertEqual(Image.open(f).format, FORMAT)
+
+    def test_jpeg_fallback(self):
+        self.assertEqual(pick_format(webp_supported=False), 'JPEG')
+        with mock.patch('recipes.images.FORMAT', 'JPEG'):
+            self.recipe.save(update_fields=replace_image(
+                self.recipe, photo('transparent', mode='RGBA')))
+            process_recipe_image(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        for name in self.names(self.recipe):
+            self.assertTrue(name.endswith('.jpg'), name)
+            with default_storage.open(name) as f:
+                self.assertEqual(Image.open(f).format, 'JPEG')
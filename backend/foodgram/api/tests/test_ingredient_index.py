@@ -0,0 +1,57 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.ingredient_index import IngredientPrefixIndex
+from recipes.changes import INGREDIENTS, bump_version, version_key
+from recipes.models import CatalogueVersion, Ingredient
+
+
+class IngredientPrefixIndexTest(TestCase):
+    """Индекс в памяти следует за версией справочника в БД."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Соль', measurement_unit='г'),
+            Ingredient(name='Ёжевика', measurement_unit='г'),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, index, prefix):
+        return [item['name'] for item in index.search(prefix, 10)]
+
+    def test_search_by_normalized_prefix(self):
+        index = IngredientPrefixIndex()
+        self.assertEqual(self.names(index, 'СО'), ['Соль'])
+        self.assertEqual(self.names(index, 'еж'), ['Ёжевика'])
+
+    def test_warm_lookup_does_not_query(self):
+        index = IngredientPrefixIndex()
+        index.search('со', 10)
+        with self.assertNumQueries(0):
+            index.search('со', 10)
+
+    def test_expired_version_reads_db_without_rebuild(self):
+        index = IngredientPrefixIndex()
+        index.search('со', 10)
+        cache.delete(version_key(INGREDIENTS))
+        with self.assertNumQueries(1):
+            index.search('со', 10)
+
+    def test_rebuilds_after_change_in_other_process(self):
+        index = IngredientPrefixIndex()
+        bump_version(INGREDIENTS)
+        self.assertEqual(self.names(index, 'со'), ['Соль'])
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Соус', measurement_unit='мл')])
+        # другой процесс меняет только строку версии в БД,
+        # здесь ее видно после истечения версии в кэше
+        CatalogueVersion.objects.filter(
+            name=INGREDIENTS).update(version=uuid4())
+        self.assertEqual(self.names(index, 'со'), ['Соль'])
+        cache.delete(version_key(INGREDIENTS))
+        self.assertEqual(self.names(index, 'со'), ['Соль', 'Соус'])
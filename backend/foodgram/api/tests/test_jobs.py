@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.shopping_list import delete_expired_exports, get_export_storage
+from api.tasks import export_shopping_list_task
+from api.tests.factories import create_user
+from jobs.models import Job
+from jobs.queue import TASKS, claim, delete_finished, release_stale, run, task
+from recipes.models import Ingredient, ShoppingCartIngredient
+
+
+class QueueTest(TestCase):
+    """Освобождение зависших задач и запись результата захватом."""
+
+    def make_job(self, **kwargs):
+        job = Job.objects.create(name='tests.released', **kwargs)
+        claim(job.pk, 'first')
+        Job.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - timedelta(hours=1))
+        return job
+
+    def test_release_stale_fails_exhausted_jobs(self):
+        exhausted = self.make_job(max_attempts=1)
+        retried = self.make_job(max_attempts=2)
+        self.assertEqual(release_stale(60), 2)
+        exhausted.refresh_from_db()
+        retried.refresh_from_db()
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIsNotNone(exhausted.finished_at)
+        self.assertEqual(retried.status, Job.PENDING)
+        self.assertIsNone(retried.finished_at)
+
+    def test_delete_finished_keeps_recent_and_active(self):
+        old = timezone.now() - timedelta(days=2)
+        for status in (Job.DONE, Job.FAILED, Job.PENDING):
+            Job.objects.create(name='tests.old', status=status)
+        Job.objects.update(finished_at=old)
+        Job.objects.create(
+            name='tests.recent', status=Job.DONE, finished_at=timezone.now())
+        self.assertEqual(delete_finished(24 * 60 * 60), 2)
+        self.assertEqual(
+            sorted(Job.objects.values_list('name', 'status')),
+            [('tests.old', Job.PENDING), ('tests.recent', Job.DONE)])
+
+    def test_released_worker_result_is_ignored(self):
+        job = self.make_job()
+
+        @task('tests.released')
+        def released():
+            # пока задача выполняется, ее освобождают и берет другой
+            release_stale(60)
+            claim(job.pk, 'second')
+            return {'worker': 'first'}
+
+        self.addCleanup(TASKS.pop, 'tests.released')
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertFalse(run(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.worker, 'second')
+        self.assertEqual(job.result, '')
+
+
+class ShoppingListExportTest(APITestCase):
+    """Выгрузка списка покупок в закрытое хранилище."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user('owner')
+        cls.other = create_user('other')
+        ShoppingCartIngredient.objects.create(
+            user=cls.owner, amount=3,
+            ingredient=Ingredient.objects.create(
+                name='Соль', measurement_unit='г'))
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(PRIVATE_MEDIA_ROOT=root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def export(self):
+        job = Job.objects.create(
+            name='api.export_shopping_list', user=self.owner)
+        result = export_shopping_list_task(self.owner.pk, 'txt')
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, result=f'{{"file": "{result["file"]}"}}')
+        return job, result['file']
+
+    def test_file_is_private_and_random(self):
+        _, first = self.export()
+        _, second = self.export()
+        self.assertNotEqual(first, second)
+        self.assertFalse(os.path.exists(
+            os.path.join(settings.MEDIA_ROOT, first)))
+        self.assertTrue(get_export_storage().exists(first))
+
+    def test_download_only_by_owner(self):
+        job, _ = self.export()
+        url = f'/api/jobs/{job.pk}/file/'
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(f'/api/jobs/{job.pk}/')
+        self.assertTrue(response.data['result']['file'].endswith(url))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Соль - 3 г', b''.join(response).decode())
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_expired_exports_are_deleted(self):
+        job, path = self.export()
+        expired = timezone.now() - timedelta(
+            seconds=settings.SHOPPING_LIST_EXPORT_TTL + 60)
+        full_path = get_export_storage().path(path)
+        os.utime(full_path, (expired.timestamp(), expired.timestamp()))
+        self.assertEqual(delete_expired_exports(), 1)
+        self.assertFalse(os.path.exists(full_path))
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(f'/api/jobs/{job.pk}/file/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class LoadIngredientsTest(TestCase):
+    """Загрузка справочника ингредиентов командой load_ingredients."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def load(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'load_ingredients', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def ingredients(self):
+        return set(Ingredient.objects.values_list(
+            'name', 'measurement_unit'))
+
+    def test_csv_twice_adds_no_duplicates(self):
+        path = self.write(
+            'ingredients.csv', 'соль,г\nсахар,г\n соль , г\nмолоко,мл\n')
+        out, _ = self.load(path, '--batch-size', '2')
+        self.assertIn('добавлено 3, уже были 1, пропущено некорректных 0',
+                      out)
+        out, _ = self.load(path)
+        self.assertIn('добавлено 0, уже были 4, пропущено некорректных 0',
+                      out)
+        self.assertEqual(self.ingredients(), {
+            ('соль', 'г'), ('сахар', 'г'), ('молоко', 'мл')})
+
+    def test_json(self):
+        path = self.write('ingredients.json', json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'молоко', 'measurement_unit': 'мл'},
+        ]))
+        out, _ = self.load(path)
+        self.assertIn('добавлено 2, уже были 0, пропущено некорректных 0',
+                      out)
+        self.assertEqual(
+            self.ingredients(), {('соль', 'г'), ('молоко', 'мл')})
+
+    def test_malformed_rows_are_reported(self):
+        path = self.write('ingredients.json', json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            'перец',
+            {'name': 'сахар'},
+            {'name': 5, 'measurement_unit': 'г'},
+            {'name': 'я' * 201, 'measurement_unit': 'г'},
+            ['мука', 'г'],
+        ]))
+        out, err = self.load(path)
+        self.assertIn('добавлено 2, уже были 0, пропущено некорректных 4',
+                      out)
+        self.assertIn("запись 2: 'перец'", err)
+        self.assertIn('запись 3:', err)
+        self.assertEqual(self.ingredients(), {('соль', 'г'), ('мука', 'г')})
+
+    def test_short_csv_row(self):
+        path = self.write('ingredients.csv', 'соль,г\nперец\n,г\n')
+        out, err = self.load(path)
+        self.assertIn('добавлено 1, уже были 0, пропущено некорректных 2',
+                      out)
+        self.assertIn("запись 2: ['перец']", err)
+
+    def test_malformed_json_is_command_error(self):
+        path = self.write(
+            'ingredients.json',
+            '[{"name": "соль", "measurement_unit": "г"}, {"name": ')
+        with self.assertRaisesMessage(CommandError, 'символ 54'):
+            self.load(path)
+        self.assertEqual(self.ingredients(), set())
@@ -0,0 +1,30 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.management.commands.load_tags import DEFAULT_TAGS
+from recipes.models import Tag
+
+
+class LoadTagsTest(TestCase):
+    """Загрузка тегов командой load_tags."""
+
+    def load(self):
+        out = StringIO()
+        call_command('load_tags', stdout=out)
+        return out.getvalue()
+
+    def test_twice(self):
+        self.assertIn('добавлено 3, пропущено из-за конфликтов 0, '
+                      'обновлено 0, без изменений 0', self.load())
+        self.assertIn('добавлено 0, пропущено из-за конфликтов 0, '
+                      'обновлено 0, без изменений 3', self.load())
+
+    def test_conflicting_tag_is_not_counted(self):
+        breakfast = DEFAULT_TAGS[0]
+        Tag.objects.create(
+            name=breakfast['name'], color='#000000', slug='morning')
+        self.assertIn('добавлено 2, пропущено из-за конфликтов 1',
+                      self.load())
+        self.assertFalse(Tag.objects.filter(slug=breakfast['slug']).exists())
@@ -0,0 +1,79 @@
+import threading
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_user
+from users.locks import lock_user
+from users.models import Follow
+
+
+class UserLockTest(APITestCase):
+    """Блокировка пользователя не берет строку users_user."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+
+    def test_follow_does_not_lock_user_row(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse([
+            query['sql'] for query in queries.captured_queries
+            if 'FOR UPDATE' in query['sql']
+        ])
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'блокировки строк есть только на PostgreSQL')
+class MutualFollowTest(TransactionTestCase):
+    """Встречные подписки двух пользователей не взаимоблокируются."""
+
+    def setUp(self):
+        self.first = create_user('first')
+        self.second = create_user('second')
+
+    def run_both(self, action):
+        """action(user, other) для обоих пользователей одновременно:
+        каждый берет свою блокировку до записи связи."""
+        barrier = threading.Barrier(2, timeout=10)
+        errors = []
+
+        def worker(user, other):
+            try:
+                with transaction.atomic():
+                    lock_user(user.pk)
+                    barrier.wait()
+                    action(user, other)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=pair)
+            for pair in ((self.first, self.second),
+                         (self.second, self.first))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_mutual_follow_and_unfollow(self):
+        self.run_both(
+            lambda user, other: Follow.objects.create(
+                user=user, author=other))
+        self.assertEqual(Follow.objects.count(), 2)
+        self.run_both(
+            lambda user, other: Follow.objects.get(
+                user=user, author=other).delete())
+        self.assertEqual(Follow.objects.count(), 0)
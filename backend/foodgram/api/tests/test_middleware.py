@@ -0,0 +1,68 @@
+import json
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from api import middleware
+from api.middleware import ServerTimingMiddleware
+from api.tests.factories import create_user
+
+
+class ServerTimingDisabledTest(SimpleTestCase):
+    """Без PERFORMANCE_MONITORING middleware не подключается."""
+
+    @override_settings(PERFORMANCE_MONITORING=False)
+    def test_not_used_when_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ServerTimingMiddleware(lambda request: None)
+
+
+@override_settings(
+    PERFORMANCE_MONITORING=True,
+    SERVER_TIMING_PUBLIC=False,
+    SLOW_REQUEST_THRESHOLD=60 * 1000,
+)
+class ServerTimingTest(APITestCase):
+    """Заголовок Server-Timing и лог медленных запросов."""
+
+    url = '/api/tags/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.staff = create_user('staff')
+        cls.staff.is_staff = True
+        cls.staff.save()
+
+    def test_header_for_staff(self):
+        self.client.force_authenticate(self.staff)
+        timing = self.client.get(self.url)['Server-Timing']
+        for name in ('db;dur=', 'view;dur=', 'total;dur=', 'sql;desc='):
+            self.assertIn(name, timing)
+
+    def test_no_header_for_others(self):
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+        self.client.force_authenticate(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+
+    @override_settings(SERVER_TIMING_PUBLIC=True)
+    def test_public_header_for_anonymous(self):
+        self.assertIn('Server-Timing', self.client.get(self.url))
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_request_is_logged(self):
+        with self.assertLogs('foodgram.performance', 'WARNING') as logs:
+            self.client.get(self.url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_request')
+        self.assertEqual(record['view'], 'TagViewSet.list')
+        self.assertEqual(record['path'], self.url)
+        self.assertEqual(record['status'], 200)
+        self.assertIn('total_ms', record)
+
+    def test_fast_request_is_not_logged(self):
+        with mock.patch.object(middleware.logger, 'warning') as warning:
+            self.client.get(self.url)
+        warning.assert_not_called()
@@ -0,0 +1,56 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_recipes, create_user
+from recipes.models import Recipe
+
+
+class RecipeCursorPaginationTest(APITestCase):
+    """Курсорный режим списка рецептов по ключу (pub_date, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes(create_user('author'), 7)
+        # одна дата у всех рецептов: порядок держится только на id
+        Recipe.objects.update(pub_date=timezone.now())
+        cls.expected = list(
+            Recipe.objects.order_by('-pk').values_list('pk', flat=True))
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_equal_pub_dates_are_not_lost_or_repeated(self):
+        ids, pages = self.walk('/api/recipes/?pagination=cursor&limit=3')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(pages, 3)
+
+    def test_page_is_keyset_query(self):
+        first = self.client.get('/api/recipes/?pagination=cursor&limit=3')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(first.data['next'])
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(context.captured_queries), 3)
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('COUNT', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?pagination=cursor&cursor=x')
+        self.assertEqual(response.status_code, 404)
+
+    def test_other_ordering_falls_back_to_pages(self):
+        response = self.client.get(
+            '/api/recipes/?pagination=cursor&ordering=pub_date&limit=3')
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            sorted(self.expected)[:3])
@@ -0,0 +1,153 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.pantry_index import PantryIndex
+from api.tests.factories import create_recipes, create_user
+from recipes.changes import (CHANGES_KEEP, RECIPE_INGREDIENTS,
+                             get_change_number, get_changes, log_changes)
+from api.views import PantryView
+from recipes.models import (CatalogueChange, Ingredient, IngredientRecipe,
+                            Tag)
+
+
+class PantryIndexTest(TestCase):
+    """Индекс кладовой следует за журналом изменений в БД."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.salt = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        cls.sugar = Ingredient.objects.create(
+            name='Сахар', measurement_unit='г')
+        cls.recipe, = create_recipes(create_user('author'), 1)
+        IngredientRecipe.objects.create(
+            recipe=cls.recipe, ingredient=cls.salt, amount=1)
+
+    def setUp(self):
+        self.index = PantryIndex()
+        self.index.rank([self.salt.pk])
+
+    def add_sugar(self):
+        """изменение рецепта другим процессом: только строки в БД."""
+        IngredientRecipe.objects.create(
+            recipe=self.recipe, ingredient=self.sugar, amount=1)
+
+    def assert_has_sugar(self):
+        self.assertEqual(
+            self.index.rank([self.sugar.pk]), [(self.recipe.pk, 1, 1)])
+
+    def test_unchanged_journal_reads_only_number(self):
+        with self.assertNumQueries(1):
+            self.index.rank([self.salt.pk])
+
+    def test_applies_logged_changes(self):
+        self.add_sugar()
+        log_changes(RECIPE_INGREDIENTS, [self.recipe.pk])
+        with mock.patch.object(self.index, 'build') as build:
+            self.assert_has_sugar()
+        build.assert_not_called()
+
+    def test_full_change_rebuilds(self):
+        self.add_sugar()
+        log_changes(RECIPE_INGREDIENTS)
+        self.assert_has_sugar()
+
+    def test_too_many_changes_rebuild(self):
+        self.add_sugar()
+        self.index.max_changes = 2
+        log_changes(RECIPE_INGREDIENTS, [self.recipe.pk, 100, 101])
+        with mock.patch.object(
+                self.index, 'build', wraps=self.index.build) as build:
+            self.assert_has_sugar()
+        build.assert_called_once()
+
+    def test_pruned_journal_rebuilds(self):
+        since = get_change_number(RECIPE_INGREDIENTS)
+        self.add_sugar()
+        log_changes(RECIPE_INGREDIENTS, [self.recipe.pk])
+        CatalogueChange.objects.filter(pk=since).delete()
+        self.assertIsNone(get_changes(
+            RECIPE_INGREDIENTS, since,
+            get_change_number(RECIPE_INGREDIENTS), 10))
+        self.assert_has_sugar()
+
+
+class ChangeJournalTest(TestCase):
+    """Журнал изменений в БД."""
+
+    def test_changes_between_numbers(self):
+        since = get_change_number(RECIPE_INGREDIENTS)
+        log_changes(RECIPE_INGREDIENTS, [1, 2])
+        log_changes(RECIPE_INGREDIENTS, [2])
+        last = get_change_number(RECIPE_INGREDIENTS)
+        self.assertEqual(
+            get_changes(RECIPE_INGREDIENTS, since, last, 10), {1, 2})
+        self.assertIsNone(get_changes(RECIPE_INGREDIENTS, since, last, 2))
+        self.assertEqual(
+            get_changes(RECIPE_INGREDIENTS, last, last, 10), set())
+
+    def test_old_entries_are_pruned_except_last(self):
+        log_changes(RECIPE_INGREDIENTS, [1, 2])
+        CatalogueChange.objects.update(
+            created=timezone.now() - CHANGES_KEEP - timedelta(minutes=1))
+        since = get_change_number(RECIPE_INGREDIENTS)
+        log_changes(RECIPE_INGREDIENTS, [3])
+        last = get_change_number(RECIPE_INGREDIENTS)
+        self.assertEqual(
+            list(CatalogueChange.objects.filter(
+                name=RECIPE_INGREDIENTS).values_list('pk', flat=True)),
+            [since, last])
+        self.assertEqual(
+            get_changes(RECIPE_INGREDIENTS, since, last, 10), {3})
+
+
+class PantryViewTest(APITestCase):
+    """Фильтры списка рецептов поверх индекса кладовой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ing{i}', measurement_unit='g')
+            for i in range(3)
+        ]
+        cls.dinner = Tag.objects.create(
+            name='Обед', color='#49B64E', slug='dinner')
+        breakfast = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+        author = create_user('author')
+        cls.recipes = create_recipes(
+            author, 5, tags=(cls.dinner, breakfast),
+            ingredients=cls.ingredients)
+        # под фильтр подходит, но в кладовой его нет
+        create_recipes(create_user('other'), 1, tags=(cls.dinner, ))
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('api.views.pantry_index', PantryIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_filter_checks_only_candidates(self):
+        with mock.patch.object(PantryView, 'filter_chunk_size', 3):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(
+                    '/api/recipes/pantry/',
+                    {'ingredients': self.ingredients[0].pk, 'tags': 'dinner'})
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[number].pk for number in (0, 2, 4)])
+        filters = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT "recipes_recipe"."id" FROM')
+        ]
+        self.assertEqual(len(filters), 2)
+        for sql in filters:
+            self.assertIn('"recipes_recipe"."id" IN (', sql)
@@ -0,0 +1,102 @@
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_recipes, create_user
+from recipes.models import Favorite, Ingredient, ShoppingCart, Tag
+from users.models import Follow
+
+# блокировка пользователя - запрос только на PostgreSQL
+LOCK_QUERIES = 1 if connection.vendor == 'postgresql' else 0
+
+
+class QueryBudgetTest(APITestCase):
+    """Число запросов к БД на эндпоинт не зависит от числа строк.
+
+    Каждый эндпоинт проверяется на двух объемах данных с одним бюджетом,
+    поэтому возврат N+1 в сериализаторах ломает тест.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(name=f'tag{i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ing{i}', measurement_unit='g')
+            for i in range(10)
+        ]
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{i}') for i in range(2)]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def grow(self, recipes_per_author):
+        """рецепты авторов, подписки, избранное и корзина читателя."""
+        recipes = []
+        for author in self.authors:
+            recipes += create_recipes(
+                author, recipes_per_author, self.tags, self.ingredients)
+            Follow.objects.get_or_create(user=self.user, author=author)
+        for recipe in recipes[::2]:
+            Favorite.objects.create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        return recipes
+
+    def assert_budget(self, budget, method, get_url, **kwargs):
+        """один бюджет на маленьком и на большом наборе данных;
+        потоковый ответ дочитывается внутри замера."""
+        for recipes_per_author in (1, 5):
+            url = get_url(self.grow(recipes_per_author))
+            with self.subTest(url=url, recipes=recipes_per_author):
+                with self.assertNumQueries(budget):
+                    response = getattr(self.client, method)(url, **kwargs)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+
+    def test_recipe_list(self):
+        self.assert_budget(
+            7, 'get', lambda recipes: '/api/recipes/?limit=20')
+
+    def test_recipe_list_anonymous(self):
+        self.client.force_authenticate(None)
+        self.assert_budget(
+            4, 'get', lambda recipes: '/api/recipes/?limit=20')
+
+    def test_recipe_detail(self):
+        self.assert_budget(
+            6, 'get', lambda recipes: f'/api/recipes/{recipes[0].pk}/')
+
+    def test_favorite_list(self):
+        self.assert_budget(
+            7, 'get', lambda recipes: '/api/recipes/?is_favorited=1')
+
+    def test_shopping_cart_list(self):
+        self.assert_budget(
+            7, 'get', lambda recipes: '/api/recipes/?is_in_shopping_cart=1')
+
+    def test_subscriptions(self):
+        self.assert_budget(
+            3, 'get',
+            lambda recipes: '/api/users/subscriptions/?recipes_limit=3')
+
+    def test_shopping_cart_download(self):
+        self.assert_budget(
+            2, 'get', lambda recipes: '/api/recipes/download_shopping_cart/')
+
+    def test_shopping_cart_summary(self):
+        self.assert_budget(
+            2, 'get', lambda recipes: '/api/recipes/shopping_cart/summary/')
+
+    def test_favorite_add(self):
+        self.assert_budget(
+            7 + LOCK_QUERIES, 'post',
+            lambda recipes: f'/api/recipes/{recipes[1].pk}/favorite/')
+
+    def test_shopping_cart_add(self):
+        self.assert_budget(
+            13 + 2 * LOCK_QUERIES, 'post',
+            lambda recipes: f'/api/recipes/{recipes[1].pk}/shopping_cart/')
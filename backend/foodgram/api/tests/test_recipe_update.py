@@ -0,0 +1,119 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_recipes, create_user
+from recipes.models import (Ingredient, IngredientRecipe, ShoppingCart,
+                            ShoppingCartIngredient, Tag, TagRecipe)
+
+RELATION_TABLES = (
+    IngredientRecipe._meta.db_table,
+    TagRecipe._meta.db_table,
+    ShoppingCartIngredient._meta.db_table,
+)
+
+
+class RecipeUpdateTest(APITestCase):
+    """Редактирование рецепта меняет только изменившиеся связи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        cls.tags = [
+            Tag.objects.create(name=f'tag{i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ing{i}', measurement_unit='g')
+            for i in range(4)
+        ]
+        # ингредиенты рецепта: ing0 - 1, ing1 - 2, ing2 - 3
+        cls.recipe = create_recipes(
+            cls.author, 1, cls.tags[:1], cls.ingredients[:3])[0]
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def patch(self, amounts, tags=None):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'ingredients': [
+                    {'id': self.ingredients[number].pk, 'amount': amount}
+                    for number, amount in amounts.items()
+                ],
+                'tags': [tag.pk for tag in tags or self.tags[:1]],
+                'name': 'Новое название',
+                'text': 'text',
+                'cooking_time': 5,
+            },
+            format='json',
+        )
+
+    def recipe_amounts(self):
+        return dict(IngredientRecipe.objects.filter(
+            recipe=self.recipe).values_list('ingredient', 'amount'))
+
+    def cart_amounts(self):
+        return dict(ShoppingCartIngredient.objects.filter(
+            user=self.reader).values_list('ingredient', 'amount'))
+
+    def expected(self, amounts):
+        return {
+            self.ingredients[number].pk: amount
+            for number, amount in amounts.items()
+        }
+
+    def test_unchanged_relations_are_not_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch({0: 1, 1: 2, 2: 3})
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            and any(table in query['sql'] for table in RELATION_TABLES)
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(response.data['name'], 'Новое название')
+
+    def test_amount_change(self):
+        self.assertEqual(self.patch({0: 1, 1: 5, 2: 3}).status_code, 200)
+        self.assertEqual(self.recipe_amounts(), self.expected({
+            0: 1, 1: 5, 2: 3}))
+        self.assertEqual(self.cart_amounts(), self.expected({
+            0: 1, 1: 5, 2: 3}))
+
+    def test_add_and_remove(self):
+        response = self.patch({1: 2, 2: 3, 3: 7}, tags=self.tags[1:])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.recipe_amounts(), self.expected({
+            1: 2, 2: 3, 3: 7}))
+        self.assertEqual(self.cart_amounts(), self.expected({
+            1: 2, 2: 3, 3: 7}))
+        self.assertEqual(
+            list(self.recipe.tags.values_list('pk', flat=True)),
+            [self.tags[1].pk])
+
+    def test_unknown_ingredient(self):
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'ingredients': [{'id': 10 ** 6, 'amount': 1}],
+                'tags': [self.tags[0].pk],
+                'name': 'name',
+                'text': 'text',
+                'cooking_time': 5,
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+        self.assertEqual(self.recipe_amounts(), self.expected({
+            0: 1, 1: 2, 2: 3}))
+
+    def test_query_budget(self):
+        with self.assertNumQueries(25):
+            self.patch({1: 5, 2: 3, 3: 7})
@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.relations import (FAVORITES, UserRelations, get_cache_key,
+                           get_generation, update_relation)
+from api.tests.factories import create_recipes, create_user
+from recipes.models import Favorite
+
+
+@override_settings(USER_RELATIONS_CACHE='default')
+class SharedRelationsTest(TestCase):
+    """Множества связей пользователя в общем кэше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.recipes = create_recipes(cls.user, 2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_set_loaded_before_commit_is_not_seen(self):
+        stale_key = get_cache_key(
+            self.user.pk, FAVORITES,
+            get_generation(cache, self.user.pk, FAVORITES))
+        first = Favorite.objects.create(
+            user=self.user, recipe=self.recipes[0])
+        Favorite.objects.create(user=self.user, recipe=self.recipes[1])
+        update_relation(first)
+        # параллельный запрос прочитал связи до коммита и кладет
+        # множество в кэш уже после сброса
+        cache.set(stale_key, frozenset())
+        self.assertEqual(
+            UserRelations(self.user).get(FAVORITES),
+            {recipe.pk for recipe in self.recipes})
+
+    def test_set_is_read_from_cache(self):
+        UserRelations(self.user).favorites
+        with self.assertNumQueries(0):
+            self.assertEqual(UserRelations(self.user).favorites, set())
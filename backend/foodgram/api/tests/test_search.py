@@ -0,0 +1,116 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_user
+from jobs.models import Job
+from jobs.queue import claim, run
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, Tag,
+                            TagRecipe)
+from recipes.search import FTS_TABLE
+
+
+class RecipeSearchTest(APITestCase):
+    """Полнотекстовый поиск ?search= по рецептам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.other = create_user('other')
+        cls.tag = Tag.objects.create(
+            name='Обед', color='#49B64E', slug='dinner')
+        cls.basil = Ingredient.objects.create(
+            name='Базилик свежий', measurement_unit='г')
+        # новые рецепты идут первыми без ранжирования
+        cls.by_name = cls.create_recipe(
+            'Базилик по-итальянски', 'Просто и быстро', days=3)
+        cls.by_text = cls.create_recipe(
+            'Паста', 'В конце добавить базилик', days=2)
+        cls.by_ingredient = cls.create_recipe(
+            'Салат', 'Нарезать овощи', days=1, author=cls.other)
+        IngredientRecipe.objects.create(
+            recipe=cls.by_ingredient, ingredient=cls.basil, amount=10)
+        TagRecipe.objects.create(recipe=cls.by_text, tag=cls.tag)
+        cls.create_recipe('Борщ', 'Свекла и капуста', days=0)
+        # индекс обновляется после коммита, которого в TestCase нет
+        call_command('rebuild_search_index', stdout=StringIO())
+
+    @classmethod
+    def create_recipe(cls, name, text, days, author=None):
+        recipe = Recipe.objects.create(
+            author=author or cls.author, name=name, text=text,
+            image='recipes/images/test.jpg', cooking_time=5)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            pub_date=timezone.now() - timedelta(days=days))
+        return recipe
+
+    def search(self, query):
+        response = self.client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, query):
+        return [recipe['id'] for recipe in self.search(query)['results']]
+
+    def test_matches_name_text_and_ingredient(self):
+        self.assertCountEqual(
+            self.ids('search=базилик'),
+            [self.by_name.pk, self.by_text.pk, self.by_ingredient.pk])
+
+    def test_name_match_ranks_first(self):
+        self.assertEqual(self.ids('search=базилик')[0], self.by_name.pk)
+
+    def test_prefix_match(self):
+        self.assertEqual(self.ids('search=свекл'), [
+            Recipe.objects.get(name='Борщ').pk])
+
+    def test_combines_with_tags_and_author(self):
+        self.assertEqual(
+            self.ids('search=базилик&tags=dinner'), [self.by_text.pk])
+        self.assertEqual(
+            self.ids(f'search=базилик&author={self.other.pk}'),
+            [self.by_ingredient.pk])
+
+    def test_pagination(self):
+        first = self.search('search=базилик&limit=2')
+        second = self.search('search=базилик&limit=2&page=2')
+        self.assertEqual(first['count'], 3)
+        self.assertEqual(len(first['results']), 2)
+        self.assertEqual(len(second['results']), 1)
+        self.assertCountEqual(
+            [recipe['id'] for recipe in first['results']
+             + second['results']],
+            [self.by_name.pk, self.by_text.pk, self.by_ingredient.pk])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(
+            self.ids('search=базилик&ordering=-pub_date'),
+            [self.by_ingredient.pk, self.by_text.pk, self.by_name.pk])
+
+    def test_ingredient_rename_reindexes(self):
+        self.basil.name = 'Кинза'
+        self.basil.save()
+        job = Job.objects.get(name='recipes.reindex_ingredient')
+        self.assertTrue(claim(job.pk, 'test'))
+        run(job)
+        self.assertEqual(self.ids('search=кинза'), [self.by_ingredient.pk])
+        self.assertNotIn(self.by_ingredient.pk, self.ids('search=базилик'))
+
+    def test_deleted_recipe_drops_out(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.by_name.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertCountEqual(
+            self.ids('search=базилик'),
+            [self.by_text.pk, self.by_ingredient.pk])
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE rowid = %s',
+                [self.by_name.pk])
+            self.assertEqual(cursor.fetchone()[0], 0)
@@ -0,0 +1,125 @@
+import csv
+import io
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.shopping_list import render_pdf
+from api.tests.factories import create_recipes, create_user
+from recipes.models import Ingredient, ShoppingCart, ShoppingCartIngredient
+
+
+class ShoppingListTest(APITestCase):
+    """ETag и выгрузка списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.salt = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        ShoppingCartIngredient.objects.create(
+            user=cls.user, ingredient=cls.salt, amount=3)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_rename_changes_etag(self):
+        for url in ('/api/recipes/download_shopping_cart/',
+                    '/api/recipes/shopping_cart/summary/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                Ingredient.objects.filter(pk=self.salt.pk).update(
+                    name=f'Соль {url}', measurement_unit='кг')
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(SHOPPING_LIST_FONT='/nonexistent/font.ttf')
+    def test_missing_pdf_font_is_logged(self):
+        with self.assertLogs('api.shopping_list', 'ERROR') as logs:
+            b''.join(render_pdf([{
+                'ingredient__name': 'Соль', 'amount': 3,
+                'ingredient__measurement_unit': 'г'}]))
+        self.assertIn('/nonexistent/font.ttf', logs.output[0])
+
+
+class ShoppingListExportTest(APITestCase):
+    """Файлы списка покупок с итогами по рецептам корзины."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        ingredients = [
+            Ingredient.objects.create(name='Сахар', measurement_unit='г'),
+            Ingredient.objects.create(name='Молоко', measurement_unit='мл'),
+            Ingredient.objects.create(name='Мука', measurement_unit='г'),
+        ]
+        # у двух рецептов общие ингредиенты: Сахар 1+3, Молоко 2+1,
+        # Мука 3+2
+        for recipe in create_recipes(
+                create_user('author'), 2, ingredients=ingredients):
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format, **headers):
+        response = self.client.get(
+            f'{self.url}?type={file_format}', **headers)
+        if response.status_code == 200:
+            response.data = b''.join(response.streaming_content)
+        return response
+
+    def test_txt(self):
+        response = self.download('txt')
+        self.assertEqual(
+            response.data.decode(),
+            'Список покупок:\nМолоко - 3 мл\nМука - 5 г\nСахар - 4 г\n')
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="shopping_list.txt"')
+
+    def test_csv(self):
+        response = self.download('csv')
+        self.assertEqual(
+            list(csv.reader(io.StringIO(response.data.decode()))),
+            [['Ингредиент', 'Количество', 'Единица измерения'],
+             ['Молоко', '3', 'мл'],
+             ['Мука', '5', 'г'],
+             ['Сахар', '4', 'г']])
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="shopping_list.csv"')
+
+    def test_pdf(self):
+        response = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="shopping_list.pdf"')
+        self.assertTrue(response.data.startswith(b'%PDF'))
+
+    def test_default_type_is_txt(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; charset=utf-8')
+
+    def test_repeat_download_not_modified(self):
+        for file_format in ('txt', 'csv', 'pdf'):
+            with self.subTest(type=file_format):
+                etag = self.download(file_format)['ETag']
+                response = self.download(
+                    file_format, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(
+            self.download('txt')['ETag'], self.download('csv')['ETag'])
+
+    def test_bad_type(self):
+        response = self.client.get(f'{self.url}?type=docx')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('type', response.data)
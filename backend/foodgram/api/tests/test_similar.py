@@ -0,0 +1,35 @@
+from rest_framework.test import APITestCase
+
+from api.tests.factories import create_recipes, create_user
+from recipes.models import RecipeNeighbour
+
+
+class SimilarRecipesTest(APITestCase):
+    """Похожие рецепты из предрасчитанной таблицы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe, cls.close, cls.far = create_recipes(
+            create_user('author'), 3)
+        RecipeNeighbour.objects.bulk_create([
+            RecipeNeighbour(recipe=cls.recipe, neighbour=cls.far, score=0.2),
+            RecipeNeighbour(
+                recipe=cls.recipe, neighbour=cls.close, score=0.8),
+        ])
+
+    def test_neighbours_by_score(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.pk}/similar/')
+        self.assertEqual(
+            [(item['id'], item['similarity']) for item in response.data],
+            [(self.close.pk, 0.8), (self.far.pk, 0.2)])
+
+    def test_recipe_without_neighbours(self):
+        response = self.client.get(f'/api/recipes/{self.far.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    def test_unknown_or_invalid_id(self):
+        for pk in (0, 'abc'):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'/api/recipes/{pk}/similar/')
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,60 @@
+from rest_framework.test import APITestCase
+
+from api.pagination import RECIPES_LIMIT_MAX
+from api.tests.factories import create_recipes, create_user
+from users.models import Follow
+
+
+class SubscriptionsTest(APITestCase):
+    """Подписки с рецептами авторов, ограниченными recipes_limit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.prolific = create_user('prolific')
+        cls.occasional = create_user('occasional')
+        create_recipes(cls.prolific, RECIPES_LIMIT_MAX + 5)
+        create_recipes(cls.occasional, 2)
+        for author in (cls.prolific, cls.occasional):
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get(self, query=''):
+        return self.client.get(f'/api/users/subscriptions/{query}')
+
+    def authors(self, query):
+        response = self.get(query)
+        self.assertEqual(response.status_code, 200)
+        return {
+            author['id']: (len(author['recipes']), author['recipes_count'])
+            for author in response.data['results']
+        }
+
+    def test_recipes_limit(self):
+        self.assertEqual(self.authors('?recipes_limit=3'), {
+            self.prolific.pk: (3, RECIPES_LIMIT_MAX + 5),
+            self.occasional.pk: (2, 2),
+        })
+
+    def test_zero_limit(self):
+        self.assertEqual(self.authors('?recipes_limit=0'), {
+            self.prolific.pk: (0, RECIPES_LIMIT_MAX + 5),
+            self.occasional.pk: (0, 2),
+        })
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(self.authors('?recipes_limit=1000'), {
+            self.prolific.pk: (RECIPES_LIMIT_MAX, RECIPES_LIMIT_MAX + 5),
+            self.occasional.pk: (2, 2),
+        })
+        self.assertEqual(
+            self.authors('')[self.prolific.pk][0], RECIPES_LIMIT_MAX)
+
+    def test_invalid_limit(self):
+        for value in ('abc', '1.5', '-1'):
+            with self.subTest(value=value):
+                response = self.get(f'?recipes_limit={value}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipes_limit', response.data)
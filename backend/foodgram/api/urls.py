@@ -1,15 +1,18 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (FavoriteView, FollowView, IngredientViewSet, RecipeViewSet,
-                    ShoppingCartView, TagViewSet, UserFollowView, UserViewSet,
-                    download_shopping_cart)
+from .views import (FavoriteBatchView, FavoriteView, FeedView, FollowBatchView,
+                    FollowView, IngredientViewSet, JobViewSet, PantryView,
+                    RecipeViewSet, ShoppingCartBatchView, ShoppingCartView,
+                    TagViewSet, UserFollowView, UserViewSet,
+                    download_shopping_cart, shopping_cart_summary)
 
 app_name = 'api'
 
 router = DefaultRouter()
 
 router.register('ingredients', IngredientViewSet, basename='ingredients')
+router.register('jobs', JobViewSet, basename='jobs')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('tags', TagViewSet, basename='tags')
 router.register('users', UserViewSet, basename='users')
@@ -20,6 +23,36 @@ urlpatterns = [
         download_shopping_cart,
         name='download_shopping_cart'
     ),
+    path(
+        'recipes/pantry/',
+        PantryView.as_view(),
+        name='pantry'
+    ),
+    path(
+        'recipes/feed/',
+        FeedView.as_view(),
+        name='feed'
+    ),
+    path(
+        'recipes/shopping_cart/summary/',
+        shopping_cart_summary,
+        name='shopping_cart_summary'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        ShoppingCartBatchView.as_view(),
+        name='shopping_cart_batch'
+    ),
+    path(
+        'recipes/favorite/',
+        FavoriteBatchView.as_view(),
+        name='favorite_batch'
+    ),
+    path(
+        'users/subscribe/',
+        FollowBatchView.as_view(),
+        name='subscribe_batch'
+    ),
     path(
         'recipes/<int:id>/shopping_cart/',
         ShoppingCartView.as_view(),
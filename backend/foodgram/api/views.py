@@ -1,47 +1,95 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
-from rest_framework.decorators import action, api_view
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListAPIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.filters import IngredientSearchFilter, RecipeFilter
-from api.pagination import CustomPagination
+from api.cache import VersionedCacheMixin
+from api.filters import RecipeFilter
+from api.ingredient_index import ingredient_index, normalize
+from api.pagination import (CustomPagination, FeedPagination,
+                            RecipePagination, get_recipes_limit)
+from api.pantry_index import pantry_index
 from api.permissions import IsAdminOrAuthorOrReadOnly
-from api.serializers import (CreateUpdateRecipeSerializer, FavoriteSerializer,
-                             FollowSerializer, IngredientSerializer,
+from api.relations import (FAVORITES, FOLLOWING, SHOPPING_CART,
+                           reset_relation)
+from api.serializers import (BatchIdsSerializer, CreateUpdateRecipeSerializer,
+                             FavoriteSerializer, FollowSerializer,
+                             IngredientSerializer, JobSerializer,
+                             PantryRecipeSerializer, PantrySerializer,
                              RecipeSerializer, ShoppingCartSerializer,
-                             TagSerializer, UserFollowSerializer,
-                             UserListSerializer)
+                             SimilarRecipeSerializer, TagSerializer,
+                             UserFollowSerializer, UserListSerializer)
+from api.shopping_list import (FIELDS, FORMATS, get_etag, get_export_storage,
+                               get_shopping_list, hash_rows)
+from jobs.models import Job
+from jobs.queue import enqueue
+from recipes.cart_totals import change_cart_totals
+from recipes.changes import INGREDIENTS, TAGS
+from recipes.counters import refresh_counter
+from recipes.feed import followed, get_feed_keys, unfollowed
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Tag)
+                            RecipeNeighbour, ShoppingCart, Tag)
+from recipes.similar import chunks
+from users.locks import lock_user
 from users.models import Follow
 
 
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     """представление для тегов."""
+    cache_version_name = TAGS
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny, )
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(VersionedCacheMixin, viewsets.ModelViewSet):
     """представление для ингредиентов."""
+    cache_version_name = INGREDIENTS
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny, )
-    filter_backends = (DjangoFilterBackend, IngredientSearchFilter,)
-    search_fields = ('^name', )
     pagination_class = None
+    search_limit = 20
+    max_search_limit = 100
+
+    def get_search_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return self.search_limit
+        return max(1, min(limit, self.max_search_limit))
+
+    def get_cache_params(self, request):
+        """название в виде для поиска и лимит после ограничения."""
+        if 'name' not in request.query_params:
+            return {}
+        return {
+            'name': normalize(request.query_params['name']),
+            'limit': self.get_search_limit(),
+        }
+
+    def list(self, request, *args, **kwargs):
+        """поиск по началу названия ?name= идет по индексу в памяти."""
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return self.get_cached_response(request, lambda: Response(
+            ingredient_index.search(name, self.get_search_limit())))
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -61,7 +109,27 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class FollowView(APIView):
+class UserLockMixin:
+    """изменяющие запросы идут в транзакции под блокировкой пользователя.
+
+    Параллельные одиночные и массовые запросы одного пользователя
+    выполняются по очереди, поэтому проверка существующих связей
+    совпадает с тем, что будет записано.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            lock_user(request.user.pk)
+
+
+class FollowView(UserLockMixin, APIView):
     """добавление/удаление подписки на автора."""
     queryset = Follow.objects.all()
     permission_classes = (IsAuthenticated, )
@@ -97,9 +165,25 @@ class UserFollowView(ListAPIView):
     permission_classes = (IsAuthenticated, )
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        """авторы с первыми recipes_limit рецептами каждого,
+        выбранными одним запросом на всю страницу."""
+        limit = get_recipes_limit(self.request)
+        latest_recipes = Recipe.objects.filter(
+            author=OuterRef('author')
+        ).values('pk')[:limit]
+        return User.objects.filter(
+            author__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).prefetch_related(Prefetch(
+            'recipes',
+            queryset=Recipe.objects.filter(pk__in=Subquery(latest_recipes)),
+            to_attr='limited_recipes',
+        ))
+
     def get(self, request):
-        user = request.user
-        queryset = User.objects.filter(author__user=user)
+        queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
         serializer = UserFollowSerializer(
             page, many=True, context={'request': request}
@@ -107,7 +191,7 @@ class UserFollowView(ListAPIView):
         return self.get_paginated_response(serializer.data)
 
 
-class FavoriteView(APIView):
+class FavoriteView(UserLockMixin, APIView):
     """добваление/удаление избранного."""
     queryset = Favorite.objects.all()
     permission_classes = (IsAuthenticated, )
@@ -138,14 +222,50 @@ class FavoriteView(APIView):
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
+def get_recipes():
+    """рецепты с автором, тегами и ингредиентами за постоянное
+    число запросов, флаги пользователя берутся из его множеств."""
+    return Recipe.objects.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'ingredientrecipe_set',
+            queryset=IngredientRecipe.objects.select_related('ingredient')
+        ),
+    )
+
+
 class RecipeViewSet(viewsets.ModelViewSet):
     """создание/обновление рецептов."""
     queryset = Recipe.objects.all()
     permission_classes = (IsAdminOrAuthorOrReadOnly, )
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        return get_recipes()
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='similar',
+    )
+    def similar(self, request, pk):
+        """похожие рецепты по предрасчитанной таблице.
+
+        Неверный id дает 404, а не ошибку приведения в запросе.
+        """
+        recipe = generics.get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        neighbours = RecipeNeighbour.objects.filter(
+            recipe=recipe).select_related('neighbour').order_by('-score')
+        recipes = []
+        for neighbour in neighbours:
+            neighbour.neighbour.similarity = neighbour.score
+            recipes.append(neighbour.neighbour)
+        serializer = SimilarRecipeSerializer(
+            recipes, many=True, context={'request': request})
+        return Response(serializer.data)
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeSerializer
@@ -157,7 +277,83 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return context
 
 
-class ShoppingCartView(APIView):
+class FeedView(ListAPIView):
+    """рецепты авторов из подписок, новые сначала.
+
+    Ключи страницы берутся из ленты пользователя и рецептов популярных
+    авторов, сами рецепты загружаются одним запросом по id.
+    """
+    permission_classes = (IsAuthenticated, )
+    pagination_class = FeedPagination
+    serializer_class = RecipeSerializer
+
+    def get(self, request):
+        keys = self.paginate_queryset(
+            lambda position, limit: get_feed_keys(
+                request.user, position, limit))
+        recipes = get_recipes().in_bulk([pk for _, pk in keys])
+        serializer = self.get_serializer(
+            [recipes[pk] for _, pk in keys if pk in recipes], many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class PantryView(ListAPIView):
+    """рецепты из имеющихся ингредиентов ?ingredients=<id>&ingredients=<id>.
+
+    Подбор идет по индексу в памяти, фильтры списка рецептов (tags и
+    другие) применяются поверх него, ?max_missing=N оставляет рецепты,
+    где не хватает не больше N ингредиентов.
+    """
+    permission_classes = (AllowAny, )
+    pagination_class = CustomPagination
+    serializer_class = PantryRecipeSerializer
+    filter_backends = (DjangoFilterBackend, )
+    filterset_class = RecipeFilter
+    # SQLite ограничивает число параметров запроса
+    filter_chunk_size = 500
+
+    def get_queryset(self):
+        return Recipe.objects.all()
+
+    def filter_ranked(self, queryset, ranked):
+        """кандидаты из индекса, прошедшие фильтры.
+
+        Фильтры проверяются только для кандидатов, пачками по pk__in,
+        а не выгрузкой всех подходящих рецептов.
+        """
+        allowed = set()
+        for chunk in chunks(ranked, self.filter_chunk_size):
+            allowed.update(queryset.filter(
+                pk__in=[row[0] for row in chunk]
+            ).order_by().values_list('pk', flat=True))
+        return [row for row in ranked if row[0] in allowed]
+
+    def list(self, request):
+        params = {'ingredients': request.query_params.getlist('ingredients')}
+        if 'max_missing' in request.query_params:
+            params['max_missing'] = request.query_params['max_missing']
+        serializer = PantrySerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        ranked = pantry_index.rank(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data.get('max_missing'),
+        )
+        queryset = self.filter_queryset(self.get_queryset())
+        if queryset.query.has_filters():
+            ranked = self.filter_ranked(queryset, ranked)
+        page = self.paginate_queryset(ranked)
+        recipes = get_recipes().in_bulk([row[0] for row in page])
+        found = []
+        for recipe_id, matched, missing in page:
+            if recipe_id in recipes:
+                recipe = recipes[recipe_id]
+                recipe.matched, recipe.missing = matched, missing
+                found.append(recipe)
+        serializer = self.get_serializer(found, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ShoppingCartView(UserLockMixin, APIView):
     """добавление/удаление корзины покупок."""
     permission_classes = (IsAuthenticated, )
 
@@ -189,23 +385,229 @@ class ShoppingCartView(APIView):
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
+class BatchRelationView(UserLockMixin, APIView):
+    """массовое добавление/удаление связей пользователя по списку id.
+
+    Все id проверяются одним запросом под блокировкой пользователя.
+    Добавление - один bulk_create, удаление - один DELETE без сигналов,
+    поэтому счетчики и множества связей обновляются здесь же, и число
+    запросов не растет с размером пачки.
+    """
+    permission_classes = (IsAuthenticated, )
+    model = None
+    target_model = None
+    target_field = None
+    counter_field = None
+    relation_kind = None
+
+    def get_ids(self, request):
+        serializer = BatchIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['ids']))
+
+    def get_targets(self, request, ids):
+        """найденные id и признак существующей связи, одним запросом."""
+        return dict(self.target_model.objects.filter(pk__in=ids).annotate(
+            linked=Exists(self.model.objects.filter(
+                user=request.user, **{self.target_field: OuterRef('pk')}))
+        ).values_list('pk', 'linked'))
+
+    def is_allowed(self, request, target_id):
+        return True
+
+    def changed(self, request, target_ids):
+        """пересчет счетчиков и сброс множества пользователя."""
+        refresh_counter(
+            self.target_model, self.counter_field, self.model,
+            self.target_field, target_ids)
+        user_id = request.user.id
+        transaction.on_commit(
+            lambda: reset_relation(user_id, self.relation_kind))
+
+    def created(self, request, target_ids):
+        self.changed(request, target_ids)
+
+    def deleted(self, request, target_ids):
+        self.changed(request, target_ids)
+
+    def post(self, request):
+        ids = self.get_ids(request)
+        targets = self.get_targets(request, ids)
+        results, created = [], []
+        for target_id in ids:
+            if target_id not in targets:
+                result = 'not_found'
+            elif targets[target_id]:
+                result = 'exists'
+            elif not self.is_allowed(request, target_id):
+                result = 'not_allowed'
+            else:
+                result = 'created'
+                created.append(target_id)
+            results.append({'id': target_id, 'status': result})
+        if created:
+            self.model.objects.bulk_create([
+                self.model(
+                    user=request.user,
+                    **{f'{self.target_field}_id': target_id})
+                for target_id in created
+            ])
+            self.created(request, created)
+        return Response({'results': results})
+
+    def delete(self, request):
+        ids = self.get_ids(request)
+        targets = self.get_targets(request, ids)
+        results, deleted = [], []
+        for target_id in ids:
+            if target_id not in targets:
+                result = 'not_found'
+            elif not targets[target_id]:
+                result = 'not_linked'
+            else:
+                result = 'deleted'
+                deleted.append(target_id)
+            results.append({'id': target_id, 'status': result})
+        if deleted:
+            queryset = self.model.objects.filter(
+                user=request.user, **{f'{self.target_field}__in': deleted})
+            # на связи никто не ссылается, каскада нет
+            queryset._raw_delete(queryset.db)
+            self.deleted(request, deleted)
+        return Response({'results': results})
+
+
+class FavoriteBatchView(BatchRelationView):
+    """массовое добавление/удаление избранного."""
+    model = Favorite
+    target_model = Recipe
+    target_field = 'recipe'
+    counter_field = 'favorites_count'
+    relation_kind = FAVORITES
+
+
+class ShoppingCartBatchView(BatchRelationView):
+    """массовое добавление/удаление рецептов в корзине."""
+    model = ShoppingCart
+    target_model = Recipe
+    target_field = 'recipe'
+    counter_field = 'in_carts_count'
+    relation_kind = SHOPPING_CART
+
+    def created(self, request, target_ids):
+        """и итоги корзины по ингредиентам."""
+        super().created(request, target_ids)
+        change_cart_totals(request.user.id, target_ids, 1)
+
+    def deleted(self, request, target_ids):
+        """и итоги корзины по ингредиентам."""
+        super().deleted(request, target_ids)
+        change_cart_totals(request.user.id, target_ids, -1)
+
+
+class FollowBatchView(BatchRelationView):
+    """массовая подписка/отписка от авторов."""
+    model = Follow
+    target_model = User
+    target_field = 'author'
+    counter_field = 'followers_count'
+    relation_kind = FOLLOWING
+
+    def is_allowed(self, request, target_id):
+        """на себя подписаться нельзя."""
+        return target_id != request.user.id
+
+    def created(self, request, target_ids):
+        """и ленту подписчика."""
+        super().created(request, target_ids)
+        followed(request.user.id, target_ids)
+
+    def deleted(self, request, target_ids):
+        """и ленту бывшего подписчика."""
+        super().deleted(request, target_ids)
+        unfollowed(request.user.id, target_ids)
+
+
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
 def download_shopping_cart(request):
-    """скачать список покупок."""
-    ingredient_list = "Cписок покупок:"
-    ingredients = IngredientRecipe.objects.filter(
-        recipe__shopping_cart__user=request.user
-    ).values(
-        'ingredient__name', 'ingredient__measurement_unit'
-    ).annotate(amount=Sum('amount'))
-    for num, i in enumerate(ingredients):
-        ingredient_list += (
-            f"\n{i['ingredient__name']} - "
-            f"{i['amount']} {i['ingredient__measurement_unit']}"
+    """скачать список покупок в формате ?type=txt|csv|pdf.
+
+    С ?async=true файл готовится в фоне, а в ответе - задача для опроса.
+    """
+    file_format = request.query_params.get('type', 'txt')
+    if file_format not in FORMATS:
+        raise ValidationError(
+            {'type': f'Доступные форматы: {", ".join(FORMATS)}.'})
+    if request.query_params.get('async') in ('1', 'true'):
+        job = enqueue(
+            'api.export_shopping_list',
+            user=request.user,
+            user_id=request.user.pk,
+            file_format=file_format,
         )
-        if num < ingredients.count() - 1:
-            ingredient_list += ', '
-    file = 'shopping_list'
-    response = HttpResponse(ingredient_list, 'Content-Type: application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{file}.pdf"'
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    etag = get_etag(request.user, file_format)
+    response = get_conditional_response(request, etag=f'"{etag}"')
+    if response is not None:
+        return response
+    render, content_type = FORMATS[file_format]
+    rows = get_shopping_list(request.user).iterator()
+    response = StreamingHttpResponse(render(rows), content_type=content_type)
+    response['ETag'] = f'"{etag}"'
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_list.{file_format}"')
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def shopping_cart_summary(request):
+    """число рецептов и итоги по ингредиентам корзины без выгрузки файла."""
+    ingredients = list(get_shopping_list(request.user))
+    recipes_count = ShoppingCart.objects.filter(user=request.user).count()
+    etag = hash_rows(
+        [[row[field] for field in FIELDS] for row in ingredients],
+        f'summary:{recipes_count}')
+    response = get_conditional_response(request, etag=f'"{etag}"')
+    if response is not None:
+        return response
+    response = Response({
+        'recipes_count': recipes_count,
+        'ingredients': [
+            {
+                'id': row['ingredient__id'],
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+                'amount': row['amount'],
+            }
+            for row in ingredients
+        ],
+    })
+    response['ETag'] = f'"{etag}"'
+    response['Cache-Control'] = 'private, no-cache'
     return response
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """статус фоновых задач пользователя."""
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated, )
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    @action(detail=True)
+    def file(self, request, pk=None):
+        """файл, выгруженный задачей; доступен только ее владельцу."""
+        path = (self.get_object().result_data or {}).get('file')
+        storage = get_export_storage()
+        if not path or not storage.exists(path):
+            raise Http404
+        extension = path.rsplit('.', 1)[-1]
+        return FileResponse(
+            storage.open(path), as_attachment=True,
+            filename=f'shopping_list.{extension}')
@@ -0,0 +1,24 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', default='gthread')
+# каждый поток держит свое соединение с БД DB_CONN_MAX_AGE секунд, поэтому
+# workers * threads вместе с потоками обработчика задач должно оставаться
+# меньше max_connections PostgreSQL; число воркеров не растет с числом CPU
+workers = int(os.getenv('GUNICORN_WORKERS', default=2))
+threads = int(os.getenv('GUNICORN_THREADS', default=4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=2000))
+max_requests_jitter = max_requests // 10
+db_max_connections = int(os.getenv('DB_MAX_CONNECTIONS', default=100))
+
+
+def on_starting(server):
+    """предупреждение, если соединений с БД может стать больше лимита."""
+    connections = workers * threads
+    if connections >= db_max_connections:
+        server.log.warning(
+            'workers * threads = %s соединений с БД при max_connections %s: '
+            'уменьшите GUNICORN_WORKERS/GUNICORN_THREADS или поставьте '
+            'pgbouncer', connections, db_max_connections)
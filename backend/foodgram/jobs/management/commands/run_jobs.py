@@ -0,0 +1,54 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.models import Job
+from jobs.queue import (claim, delete_finished, get_ready_jobs, release_stale,
+                        run_in_thread)
+
+CLEANUP_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    """обработчик фоновых задач из очереди в БД."""
+    help = 'Выполняем фоновые задачи в пуле потоков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='выполнить готовые задачи и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        workers = options['workers']
+        self.stdout.write(f'Обработчик {worker}, потоков: {workers}')
+        running = set()
+        cleaned_at = None
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                close_old_connections()
+                release_stale(settings.JOBS_TIMEOUT)
+                if (cleaned_at is None
+                        or time.monotonic() - cleaned_at >= CLEANUP_INTERVAL):
+                    delete_finished(settings.JOBS_KEEP_FINISHED)
+                    cleaned_at = time.monotonic()
+                for pk in get_ready_jobs(workers - len(running)):
+                    if claim(pk, worker):
+                        running.add(executor.submit(
+                            run_in_thread, Job(pk=pk)))
+                if running:
+                    done, running = wait(
+                        running, timeout=options['poll_interval'],
+                        return_when=FIRST_COMPLETED)
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX job_pending_run_at_idx ON jobs_job (run_at) '
+            "WHERE status = 'pending'",
+            'DROP INDEX job_pending_run_at_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_status_run_at_idx',
+        ),
+    ]
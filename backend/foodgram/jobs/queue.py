@@ -0,0 +1,140 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    """регистрация функции как фоновой задачи."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, user=None, max_attempts=5, **payload):
+    """постановка задачи в очередь.
+
+    При JOBS_EAGER задача выполняется сразу, что удобно для разработки.
+    """
+    if name not in TASKS:
+        raise KeyError(f'Неизвестная задача: {name}')
+    job = Job.objects.create(
+        name=name,
+        user=user,
+        max_attempts=max_attempts,
+        payload=json.dumps(payload),
+    )
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: claim(job.pk, 'eager') and run(job))
+    return job
+
+
+def get_ready_jobs(limit):
+    """id задач, готовых к выполнению."""
+    return list(Job.objects.filter(
+        status=Job.PENDING, run_at__lte=timezone.now()
+    ).order_by('run_at').values_list('pk', flat=True)[:limit])
+
+
+def claim(pk, worker):
+    """захват задачи обработчиком; False, если ее уже забрал другой."""
+    return bool(Job.objects.filter(pk=pk, status=Job.PENDING).update(
+        status=Job.RUNNING,
+        worker=worker,
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    ))
+
+
+def release_stale(timeout):
+    """возврат в очередь задач, зависших у упавших обработчиков.
+
+    Задачи, исчерпавшие попытки, помечаются неудачными, иначе задача,
+    роняющая обработчик, перезапускалась бы бесконечно.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=now - timedelta(seconds=timeout),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        error=f'Задача не завершилась за {timeout} с.',
+        finished_at=now,
+        worker='',
+    )
+    return failed + stale.update(status=Job.PENDING, worker='')
+
+
+def delete_finished(keep):
+    """удаление выполненных и неудачных задач старше keep секунд."""
+    deleted, _ = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished_at__lt=timezone.now() - timedelta(seconds=keep),
+    ).delete()
+    return deleted
+
+
+def get_backoff(attempt):
+    """задержка перед повтором: экспоненциальная, с ограничением."""
+    return timedelta(seconds=min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempt - 1),
+        settings.JOBS_RETRY_MAX_DELAY,
+    ))
+
+
+def run(job):
+    """выполнение захваченной задачи с записью результата или ошибки.
+
+    Результат записывается, только если задача все еще за этим захватом:
+    после release_stale ее мог взять другой обработчик, и ответ
+    отставшего обработчика отбрасывается.
+    """
+    job.refresh_from_db()
+    claimed = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING,
+        worker=job.worker, attempts=job.attempts,
+    )
+    try:
+        result = TASKS[job.name](**json.loads(job.payload))
+    except Exception:
+        logger.exception('Ошибка задачи %s', job)
+        failed = job.attempts >= job.max_attempts
+        claimed.update(
+            status=Job.FAILED if failed else Job.PENDING,
+            error=traceback.format_exc(),
+            run_at=timezone.now() + get_backoff(job.attempts),
+            finished_at=timezone.now() if failed else None,
+            worker='',
+        )
+        return False
+    if not claimed.update(
+        status=Job.DONE,
+        result=json.dumps(result, ensure_ascii=False),
+        error='',
+        finished_at=timezone.now(),
+    ):
+        logger.warning('Результат задачи %s отброшен: она освобождена', job)
+        return False
+    return True
+
+
+def run_in_thread(job):
+    """выполнение в рабочем потоке со своим соединением с БД."""
+    close_old_connections()
+    try:
+        return run(job)
+    finally:
+        close_old_connections()
@@ -1,7 +1,11 @@
 from django.contrib import admin
+from django.db import transaction
 
+from .cart_totals import rebuild_cart_totals
+from .changes import RECIPE_INGREDIENTS, log_changes
 from .models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                      ShoppingCart, Tag, TagRecipe)
+from .similar import mark_stale
 
 
 class IngredientInLine(admin.TabularInline):
@@ -33,6 +37,7 @@ class RecipeAdmin(admin.ModelAdmin):
         'image',
         'text',
         'is_favorited',
+        'in_carts_count',
     )
     inlines = (IngredientInLine, TagInLine,)
     search_fields = ('author', 'name')
@@ -40,9 +45,22 @@ class RecipeAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
     def is_favorited(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     is_favorited.short_description = 'В избранном'
+    is_favorited.admin_order_field = 'favorites_count'
+
+    def save_related(self, request, form, formsets, change):
+        """пересчет итогов корзин, где лежит рецепт, и пометка похожих
+        рецептов и индекса кладовой после правки ингредиентов."""
+        super().save_related(request, form, formsets, change)
+        recipe_id = form.instance.pk
+        transaction.on_commit(
+            lambda: log_changes(RECIPE_INGREDIENTS, [recipe_id]))
+        if change:
+            mark_stale([form.instance.pk])
+            rebuild_cart_totals(users=ShoppingCart.objects.filter(
+                recipe=form.instance).values('user'))
 
 
 class TagAdmin(admin.ModelAdmin):
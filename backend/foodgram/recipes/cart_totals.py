@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import IngredientRecipe, ShoppingCartIngredient
+from users.locks import lock_user
+
+
+def change_cart_totals(user_id, recipe_ids, sign):
+    """прибавление (sign=1) или вычитание (sign=-1) ингредиентов рецептов
+    из итогов корзины пользователя."""
+    delta = dict(IngredientRecipe.objects.filter(
+        recipe__in=recipe_ids
+    ).order_by().values('ingredient').annotate(
+        total=Sum('amount')
+    ).values_list('ingredient', 'total'))
+    if not delta:
+        return
+    with transaction.atomic():
+        lock_user(user_id)
+        items = {
+            item.ingredient_id: item
+            for item in ShoppingCartIngredient.objects.filter(
+                user_id=user_id, ingredient__in=delta)
+        }
+        created, updated, emptied = [], [], []
+        for ingredient_id, amount in delta.items():
+            item = items.get(ingredient_id)
+            if item is None:
+                if sign > 0:
+                    created.append(ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    ))
+                continue
+            item.amount += sign * amount
+            if item.amount > 0:
+                updated.append(item)
+            else:
+                emptied.append(item.pk)
+        ShoppingCartIngredient.objects.bulk_create(created)
+        ShoppingCartIngredient.objects.bulk_update(updated, ['amount'])
+        if emptied:
+            ShoppingCartIngredient.objects.filter(pk__in=emptied).delete()
+
+
+def rebuild_cart_totals(users=None, ingredients=None, fix=True):
+    """сверка итогов корзин с суммой по рецептам и их пересборка.
+
+    users и ingredients ограничивают пересчет, возвращается число
+    расхождений.
+    """
+    expected_rows = IngredientRecipe.objects.order_by()
+    current_rows = ShoppingCartIngredient.objects.all()
+    if users is not None:
+        expected_rows = expected_rows.filter(
+            recipe__shopping_cart__user__in=users)
+        current_rows = current_rows.filter(user__in=users)
+    if ingredients is not None:
+        expected_rows = expected_rows.filter(ingredient__in=ingredients)
+        current_rows = current_rows.filter(ingredient__in=ingredients)
+    expected = {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in expected_rows.values(
+            'recipe__shopping_cart__user', 'ingredient'
+        ).annotate(
+            total=Sum('amount')
+        ).values_list('recipe__shopping_cart__user', 'ingredient', 'total')
+        if user_id is not None
+    }
+    current = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in current_rows.values_list(
+            'user', 'ingredient', 'amount')
+    }
+    drift = sum(
+        expected.get(key) != current.get(key)
+        for key in expected.keys() | current.keys()
+    )
+    if fix and drift:
+        with transaction.atomic():
+            current_rows.delete()
+            ShoppingCartIngredient.objects.bulk_create(
+                ShoppingCartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=amount)
+                for (user_id, ingredient_id), amount in expected.items()
+            )
+    return drift
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes.models import CatalogueChange, CatalogueVersion
+
+INGREDIENTS = 'ingredients'
+TAGS = 'tags'
+RECIPE_INGREDIENTS = 'recipe_ingredients'
+CHANGES_KEEP = timedelta(days=1)
+
+
+def version_key(name):
+    return f'catalogue_version:{name}'
+
+
+def get_version(name):
+    """версия справочника и время ее смены.
+
+    Читается из общего кэша и только при его промахе из БД, поэтому
+    горячие запросы к справочникам не обращаются к БД. Запись в кэше
+    живет CATALOGUE_VERSION_TTL секунд: с кэшем в памяти процесса это
+    предел, через который процесс увидит смену версии в другом.
+    """
+    key = version_key(name)
+    stamp = cache.get(key)
+    if stamp is None:
+        version, _ = CatalogueVersion.objects.get_or_create(name=name)
+        stamp = version.version.hex, version.modified.timestamp()
+        cache.set(key, stamp, settings.CATALOGUE_VERSION_TTL)
+    return stamp
+
+
+def bump_version(name):
+    """смена версии справочника, кэш всех процессов станет неактуальным.
+
+    Версия удаляется из общего кэша сразу и повторно после коммита:
+    читатель, успевший до коммита положить в кэш старую версию, не
+    оставит ее там до истечения TTL.
+    """
+    CatalogueVersion.objects.update_or_create(
+        name=name, defaults={'version': uuid4()})
+    key = version_key(name)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_change_number(name):
+    """номер последнего изменения в журнале.
+
+    Пустой журнал начинается с записи о полном изменении, чтобы у
+    читателя всегда был номер существующей записи.
+    """
+    number = CatalogueChange.objects.filter(name=name).aggregate(
+        number=Max('id'))['number']
+    if number is None:
+        return CatalogueChange.objects.create(name=name).pk
+    return number
+
+
+def log_changes(name, ids=None):
+    """запись id измененных объектов в журнал.
+
+    Без ids в журнале остается запись о полном изменении, и читатели
+    перестраивают свои данные целиком. Запись идет под блокировкой
+    строки журнала, чтобы номера становились видны по порядку и
+    читатель не пропустил изменение с меньшим номером. Записи старше
+    CHANGES_KEEP удаляются, кроме последней до этой записи: с нее
+    продолжают читатели, догнавшие журнал.
+    """
+    with transaction.atomic():
+        CatalogueVersion.objects.select_for_update().get_or_create(
+            name=name)
+        previous = get_change_number(name)
+        CatalogueChange.objects.bulk_create([
+            CatalogueChange(name=name, object_id=pk)
+            for pk in ids or [None]
+        ])
+    CatalogueChange.objects.filter(
+        name=name, id__lt=previous,
+        created__lt=timezone.now() - CHANGES_KEEP,
+    ).delete()
+
+
+def get_changes(name, since, last, limit):
+    """id, измененные после изменения since до last включительно.
+
+    Возвращается None, если изменений больше limit, среди них есть
+    полное изменение или запись since уже удалена из журнала.
+    """
+    rows = list(CatalogueChange.objects.filter(
+        name=name, id__gte=since, id__lte=last,
+    ).order_by('id').values_list('id', 'object_id')[:limit + 2])
+    if not rows or rows[0][0] != since or len(rows) > limit + 1:
+        return None
+    changes = {object_id for _, object_id in rows[1:]}
+    if None in changes:
+        return None
+    return changes
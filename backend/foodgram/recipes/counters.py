@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'in_carts_count', 'recipes.ShoppingCart', 'recipe'),
+    ('users.User', 'recipes_count', 'recipes.Recipe', 'author'),
+    ('users.User', 'followers_count', 'users.Follow', 'author'),
+)
+
+
+def get_actual_count(source, relation):
+    """подзапрос с фактическим числом связанных записей."""
+    return Coalesce(Subquery(
+        source.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def recount_counters(fix=True):
+    """поиск и исправление расхождений счетчиков с фактическими данными.
+
+    Возвращает число расхождений по каждому счетчику.
+    """
+    drift = {}
+    for label, field, source_label, relation in COUNTERS:
+        model = apps.get_model(label)
+        actual = get_actual_count(apps.get_model(source_label), relation)
+        drifted = model.objects.annotate(
+            actual=actual
+        ).exclude(**{field: F('actual')}).values('pk')
+        drift[f'{label}.{field}'] = drifted.count()
+        if fix and drift[f'{label}.{field}']:
+            model.objects.filter(pk__in=drifted).update(**{field: actual})
+    return drift
+
+
+def refresh_counter(model, field, source, relation, pks):
+    """пересчет счетчика у выбранных объектов одним запросом."""
+    model.objects.filter(pk__in=pks).update(
+        **{field: get_actual_count(source, relation)})
@@ -0,0 +1,130 @@
+from heapq import merge
+from itertools import groupby, islice
+
+from django.conf import settings
+
+from jobs.queue import enqueue
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, User
+
+BATCH_SIZE = 1000
+
+
+def is_fanout_author(followers_count):
+    """рецепты автора раскладываются по лентам, пока подписчиков немного,
+    рецепты популярных авторов подмешиваются в ленту при чтении."""
+    return followers_count < settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def insert_entries(model, entries):
+    """вставка записей ленты пачками, уже существующие пропускаются."""
+    inserted = 0
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return inserted
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        inserted += len(batch)
+
+
+def fan_out_recipe(recipe_id):
+    """раскладка нового рецепта по лентам подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values_list(
+        'pub_date', 'author', 'author__followers_count').first()
+    if recipe is None or not is_fanout_author(recipe[2]):
+        return 0
+    pub_date, author_id, _ = recipe
+    followers = Follow.objects.filter(
+        author=author_id).values_list('user', flat=True)
+    return insert_entries(FeedEntry, (
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for user_id in followers.iterator()
+    ))
+
+
+def backfill_feed(follows):
+    """рецепты авторов из подписок в ленты подписчиков одним запросом."""
+    rows = follows.filter(
+        author__followers_count__lt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        author__recipes__isnull=False,
+    ).values_list('user', 'author__recipes', 'author__recipes__pub_date')
+    return insert_entries(FeedEntry, (
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for user_id, recipe_id, pub_date in rows.iterator()
+    ))
+
+
+def rebuild_feeds(users=None):
+    """пересборка лент пользователей (по умолчанию всех) с нуля."""
+    follows = Follow.objects.all()
+    entries = FeedEntry.objects.all()
+    if users is not None:
+        follows = follows.filter(user__in=users)
+        entries = entries.filter(user__in=users)
+    entries.delete()
+    return backfill_feed(follows)
+
+
+def followed(user_id, author_ids):
+    """рецепты новых авторов попадут в ленту после фоновой задачи."""
+    enqueue('recipes.backfill_feed', user_id=user_id, author_ids=author_ids)
+
+
+def unfollowed(user_id, author_ids):
+    """удаление рецептов авторов из ленты после отписки.
+
+    Автор, у которого подписчиков стало меньше порога, снова
+    раскладывается по лентам, поэтому его рецепты дописываются
+    всем подписчикам. Счетчик уже уменьшен на эту отписку в той же
+    транзакции, строка автора заблокирована до коммита, так что до
+    отписки подписчиков было на одного больше.
+    """
+    FeedEntry.objects.filter(
+        user=user_id, recipe__author__in=author_ids).delete()
+    returning = [
+        pk for pk, count in User.objects.filter(
+            pk__in=author_ids,
+            followers_count__lt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ).values_list('pk', 'followers_count')
+        if not is_fanout_author(count + 1)
+    ]
+    if returning:
+        enqueue('recipes.backfill_feed', author_ids=returning)
+
+
+def after(queryset, position, pk_field):
+    """рецепты строго после курсора в порядке (-pub_date, -id).
+
+    Условие записано диапазоном по pub_date без OR, чтобы оставался
+    индекс по (автор|подписчик, -pub_date).
+    """
+    if position is None:
+        return queryset
+    pub_date, pk = position
+    return queryset.filter(pub_date__lte=pub_date).exclude(
+        pub_date=pub_date, **{f'{pk_field}__gte': pk})
+
+
+def get_feed_sources(user, position=None):
+    """ключи (pub_date, id) из ленты пользователя и из рецептов
+    популярных авторов, на которых он подписан; обе выборки идут
+    по индексу в порядке ленты."""
+    timeline = after(
+        FeedEntry.objects.filter(user=user), position, 'recipe'
+    ).order_by('-pub_date', '-recipe_id').values_list('pub_date', 'recipe')
+    popular = after(
+        Recipe.objects.filter(author__in=Follow.objects.filter(
+            user=user,
+            author__followers_count__gte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ).values('author')), position, 'pk'
+    ).order_by('-pub_date', '-pk').values_list('pub_date', 'pk')
+    return timeline, popular
+
+
+def get_feed_keys(user, position=None, limit=6):
+    """ключи limit рецептов ленты после position слиянием источников."""
+    keys = merge(
+        *(source[:limit] for source in get_feed_sources(user, position)),
+        reverse=True,
+    )
+    return [key for key, _ in islice(groupby(keys), limit)]
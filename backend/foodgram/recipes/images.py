@@ -0,0 +1,121 @@
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from jobs.queue import enqueue
+from recipes.models import Recipe
+
+RENDITIONS = {
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+QUALITY = 80
+SAVE_OPTIONS = {
+    'WEBP': {'quality': QUALITY, 'method': 4},
+    'JPEG': {'quality': QUALITY, 'optimize': True},
+}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def pick_format(webp_supported):
+    """WebP, если Pillow собран с ним, иначе JPEG."""
+    return 'WEBP' if webp_supported else 'JPEG'
+
+
+FORMAT = pick_format(features.check('webp'))
+
+
+def rendition_name(image_name, rendition):
+    """путь рендишена, однозначно выведенный из имени исходника."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'recipes/renditions/{rendition}/{stem}.{EXTENSIONS[FORMAT]}'
+
+
+def needs_processing(recipe):
+    """у рецепта новое изображение без рендишенов."""
+    return bool(recipe.image) and (
+        recipe.image_card.name != rendition_name(recipe.image.name, 'card'))
+
+
+def rendition_fields(recipe):
+    """поля рендишенов рецепта по именам полей модели."""
+    return {
+        f'image_{rendition}': getattr(recipe, f'image_{rendition}')
+        for rendition in RENDITIONS
+    }
+
+
+def delete_files(names):
+    """удаление файлов из хранилища, пустые имена пропускаются."""
+    for name in names:
+        if name:
+            default_storage.delete(name)
+
+
+def replace_image(recipe, image):
+    """замена фото рецепта; старые оригинал и рендишены удаляются после
+    коммита, поля для save(update_fields=...) возвращаются."""
+    fields = rendition_fields(recipe)
+    old_names = [recipe.image.name] + [
+        field.name for field in fields.values()]
+    recipe.image = image
+    for name in fields:
+        setattr(recipe, name, '')
+    transaction.on_commit(lambda: delete_files(old_names))
+    return ['image', *fields]
+
+
+def encode(image, size=None):
+    """перекодирование в FORMAT без метаданных, с уменьшением до size.
+
+    В JPEG нет прозрачности, поэтому изображение сводится к RGB.
+    """
+    if size is not None:
+        image = image.copy()
+        image.thumbnail(size, Image.LANCZOS)
+    if FORMAT == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, FORMAT, **SAVE_OPTIONS[FORMAT])
+    return ContentFile(buffer.getvalue())
+
+
+def process_recipe_image(recipe_id):
+    """создание рендишенов и очищенного оригинала изображения рецепта."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not needs_processing(recipe):
+        return
+    source = recipe.image.name
+    try:
+        with default_storage.open(source) as f:
+            image = Image.open(f)
+            image = ImageOps.exif_transpose(image)
+            image = image.convert(
+                'RGBA' if 'A' in image.getbands() else 'RGB')
+    except FileNotFoundError:
+        # фото заменили, и старый файл уже удален
+        return
+    stem = os.path.splitext(os.path.basename(source))[0]
+    original = default_storage.save(
+        f'recipes/images/{stem}.{EXTENSIONS[FORMAT]}', encode(image))
+    renditions = {
+        f'image_{rendition}': default_storage.save(
+            rendition_name(original, rendition), encode(image, size))
+        for rendition, size in RENDITIONS.items()
+    }
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image=original, **renditions)
+    if updated:
+        delete_files([source] + [
+            field.name for field in rendition_fields(recipe).values()])
+        return
+    delete_files([original, *renditions.values()])
+
+
+def schedule_processing(recipe_id):
+    """постановка изображения в очередь фоновых задач."""
+    enqueue('recipes.process_image', recipe_id=recipe_id)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.similar import METRICS, build_neighbours
+
+
+class Command(BaseCommand):
+    """расчет похожих рецептов по общим ингредиентам."""
+    help = 'Считаем похожие рецепты для /api/recipes/<id>/similar/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed', action='store_true',
+            help='только рецепты, измененные с прошлого запуска, '
+                 'и те, чьи списки от них зависят',
+        )
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--metric', choices=sorted(METRICS), default='cosine')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        recipes = build_neighbours(
+            changed_only=options['changed'],
+            limit=options['limit'],
+            metric=options['metric'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {recipes} '
+            f'за {time.perf_counter() - started:.2f} с.'))
@@ -0,0 +1,180 @@
+import os
+import random
+import time
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.changes import RECIPE_INGREDIENTS, log_changes
+from recipes.counters import recount_counters
+from recipes.feed import rebuild_feeds
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag, TagRecipe)
+from recipes.search import update_search_index
+from users.models import Follow, User
+
+PASSWORD = 'benchmark'
+EMAIL_DOMAIN = 'bench.foodgram.local'
+
+
+def zipf_weights(size, exponent):
+    """накопленные веса популярности по закону Ципфа."""
+    return list(accumulate(
+        1 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    """генерация синтетических данных для бенчмарков."""
+    help = 'Создаем пользователей, подписки, рецепты, избранное и корзины'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--favorites-per-user', type=int, default=30)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='удалить данные предыдущей генерации',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.random = random.Random(options['seed'])
+        self.skew = options['skew']
+        if options['clear']:
+            User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', os.path.join(
+                settings.BASE_DIR, 'data', 'ingredients.csv'))
+        if not Tag.objects.exists():
+            call_command('load_tags')
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            self.create_follows(users, options['follows_per_user'])
+            recipes = self.create_recipes(
+                users, options['recipes_per_user'],
+                options['ingredients_per_recipe'])
+            self.create_relations(
+                Favorite, users, recipes, options['favorites_per_user'])
+            self.create_relations(
+                ShoppingCart, users, recipes, options['cart_per_user'])
+            recount_counters()
+            rebuild_cart_totals()
+            rebuild_feeds()
+            update_search_index(Recipe.objects.all())
+        log_changes(RECIPE_INGREDIENTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сгенерировано за {time.perf_counter() - started:.1f} с: '
+            f'пользователей {len(users)}, рецептов {len(recipes)}.'
+        ))
+
+    def sample(self, population, weights, count):
+        """выборка без повторов с перекосом в сторону популярных."""
+        count = min(count, len(population))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(self.random.choices(
+                population, cum_weights=weights, k=count - len(chosen)))
+        return chosen
+
+    def create_users(self, count):
+        offset = User.objects.filter(
+            email__endswith=f'@{EMAIL_DOMAIN}').count()
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'bench{number}',
+                    email=f'bench{number}@{EMAIL_DOMAIN}',
+                    first_name='Бенч',
+                    last_name=f'Пользователь {number}',
+                    password=password,
+                )
+                for number in range(offset, offset + count)
+            ),
+        )
+        return list(User.objects.filter(
+            email__endswith=f'@{EMAIL_DOMAIN}'
+        ).order_by('id').values_list('id', flat=True)[offset:])
+
+    def create_follows(self, users, per_user):
+        weights = zipf_weights(len(users), self.skew)
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user, author_id=author)
+                for user in users
+                for author in self.sample(users, weights, per_user)
+                if author != user
+            ),
+            ignore_conflicts=True,
+        )
+
+    def create_recipes(self, users, per_user, ingredients_per_recipe):
+        images_dir = os.path.join(settings.MEDIA_ROOT, 'recipes', 'images')
+        images = (
+            sorted(os.listdir(images_dir)) if os.path.isdir(images_dir)
+            else ['placeholder.jpg']
+        )
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        tags = list(Tag.objects.values_list('id', flat=True))
+        last_id = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=user,
+                    name=f'Рецепт {number} автора {user}',
+                    text='Нарезать, смешать, приготовить. ' * 5,
+                    image=f'recipes/images/{self.random.choice(images)}',
+                    cooking_time=self.random.randint(5, 180),
+                )
+                for user in users
+                for number in range(per_user)
+            ),
+        )
+        recipes = list(Recipe.objects.filter(
+            id__gt=last_id).values_list('id', flat=True))
+        IngredientRecipe.objects.bulk_create(
+            (
+                IngredientRecipe(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in self.random.sample(
+                    ingredients,
+                    min(ingredients_per_recipe, len(ingredients)))
+            ),
+        )
+        TagRecipe.objects.bulk_create(
+            (
+                TagRecipe(recipe_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, len(tags)))
+            ),
+        )
+        return recipes
+
+    def create_relations(self, model, users, recipes, per_user):
+        weights = zipf_weights(len(recipes), self.skew)
+        popular = recipes[:]
+        self.random.shuffle(popular)
+        model.objects.bulk_create(
+            (
+                model(user_id=user, recipe_id=recipe)
+                for user in users
+                for recipe in self.sample(popular, weights, per_user)
+            ),
+            ignore_conflicts=True,
+        )
@@ -1,24 +1,154 @@
 import csv
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from recipes.changes import INGREDIENTS, bump_version
 from recipes.models import Ingredient
 
+JSON_CHUNK_SIZE = 64 * 1024
+NAME_MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = Ingredient._meta.get_field(
+    'measurement_unit').max_length
+
+
+def read_csv(path):
+    """потоковое чтение CSV: название, единица измерения."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            yield row[:2]
+
+
+def read_json(path):
+    """потоковое чтение JSON-массива объектов без загрузки файла целиком.
+
+    Элементы отдаются как есть, их проверяет clean_row. Синтаксическая
+    ошибка - CommandError с позицией от начала файла.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer = ''
+        offset = 0
+        started = False
+        while True:
+            chunk = f.read(JSON_CHUNK_SIZE)
+            buffer += chunk
+            position = 0
+            while True:
+                while (position < len(buffer)
+                       and buffer[position] in ' \t\r\n,'):
+                    position += 1
+                if not started and buffer[position:position + 1] == '[':
+                    started = True
+                    position += 1
+                    continue
+                if buffer[position:position + 1] in ('', ']'):
+                    break
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as error:
+                    if not chunk:
+                        raise CommandError(
+                            f'Некорректный JSON в {path}, символ '
+                            f'{offset + error.pos + 1}: {error.msg}')
+                    break
+                yield item
+            offset += position
+            buffer = buffer[position:]
+            if not chunk:
+                return
+
+
+def clean_row(row):
+    """название и единица измерения из строки CSV или объекта JSON,
+    None - если запись некорректна."""
+    if isinstance(row, dict):
+        row = [row.get('name'), row.get('measurement_unit')]
+    if not isinstance(row, (list, tuple)) or len(row) != 2:
+        return None
+    if not all(isinstance(value, str) for value in row):
+        return None
+    name, unit = row[0].strip(), row[1].strip()
+    if not (0 < len(name) <= NAME_MAX_LENGTH
+            and 0 < len(unit) <= UNIT_MAX_LENGTH):
+        return None
+    return name, unit
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
 
 class Command(BaseCommand):
     """загрузка ингредиентов в БД."""
+    help = 'Загружаем ингредиенты из CSV или JSON пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
 
     def handle(self, *args, **options):
-        self.import_ingredients()
-        print('Загрузка ингредиентов завершена.')
-
-    def import_ingredients(self, file='ingredients.csv'):
-        print(f'Загрузка {file}...')
-        file_path = f'./data/{file}'
-        with open(file_path, newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                status, created = Ingredient.objects.update_or_create(
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
+        path = options['path']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json')
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+        self.stdout.write(f'Загрузка {path}...')
+        started = time.perf_counter()
+        with transaction.atomic():
+            inserted, skipped, invalid = self.import_ingredients(
+                reader(path), options['batch_size'])
+        if inserted:
+            bump_version(INGREDIENTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка ингредиентов завершена за '
+            f'{time.perf_counter() - started:.2f} с: добавлено {inserted}, '
+            f'уже были {skipped}, пропущено некорректных {invalid}.'
+        ))
+
+    def import_ingredients(self, rows, batch_size):
+        """вставка новых ингредиентов пачками по batch_size строк.
+
+        Некорректные строки пропускаются, их номера в файле
+        выводятся в stderr.
+        """
+        inserted = skipped = invalid = 0
+        rows = enumerate(rows, start=1)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return inserted, skipped, invalid
+            keys = {}
+            for number, row in batch:
+                key = clean_row(row)
+                if key is None:
+                    invalid += 1
+                    self.stderr.write(
+                        f'Пропущена некорректная запись {number}: {row!r}')
+                    continue
+                if key in keys:
+                    skipped += 1
+                keys[key] = None
+            names = {name for name, _ in keys}
+            existing = set(Ingredient.objects.filter(
+                name__in=names).values_list('name', 'measurement_unit'))
+            Ingredient.objects.bulk_create([
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in keys if (name, unit) not in existing
+            ], ignore_conflicts=True)
+            # конфликтующие строки пропускаются молча, считаем по БД
+            added = Ingredient.objects.filter(
+                name__in=names).count() - len(existing)
+            inserted += added
+            skipped += len(keys) - added
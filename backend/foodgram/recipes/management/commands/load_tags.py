@@ -1,16 +1,42 @@
 from django.core.management import BaseCommand
+from django.db import transaction
 
+from recipes.changes import TAGS, bump_version
 from recipes.models import Tag
 
+DEFAULT_TAGS = [
+    {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
+    {'name': 'Обед', 'color': '#49B64E', 'slug': 'dinner'},
+    {'name': 'Ужин', 'color': '#8775D2', 'slug': 'supper'},
+]
+
 
 class Command(BaseCommand):
     """загрузка тегов в БД."""
     help = 'Создаем тэги'
 
     def handle(self, *args, **kwargs):
-        data = [
-            {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
-            {'name': 'Обед', 'color': '#49B64E', 'slug': 'dinner'},
-            {'name': 'Ужин', 'color': '#8775D2', 'slug': 'supper'}]
-        Tag.objects.bulk_create(Tag(**tag) for tag in data)
-        self.stdout.write(self.style.SUCCESS('Все тэги загружены!'))
+        existing = Tag.objects.in_bulk(
+            [tag['slug'] for tag in DEFAULT_TAGS], field_name='slug')
+        new, changed = [], []
+        for data in DEFAULT_TAGS:
+            tag = existing.get(data['slug'])
+            if tag is None:
+                new.append(Tag(**data))
+            elif (tag.name, tag.color) != (data['name'], data['color']):
+                tag.name, tag.color = data['name'], data['color']
+                changed.append(tag)
+        with transaction.atomic():
+            Tag.objects.bulk_create(new, ignore_conflicts=True)
+            # тег, конфликтующий по имени или цвету, пропускается молча
+            added = Tag.objects.filter(
+                slug__in=[tag.slug for tag in new]).count()
+            Tag.objects.bulk_update(changed, ['name', 'color'])
+        if added or changed:
+            bump_version(TAGS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Все тэги загружены: добавлено {added}, '
+            f'пропущено из-за конфликтов {len(new) - added}, '
+            f'обновлено {len(changed)}, без изменений '
+            f'{len(DEFAULT_TAGS) - len(new) - len(changed)}.'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import needs_processing, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """создание рендишенов для рецептов, у которых их еще нет."""
+    help = 'Обрабатываем изображения рецептов без рендишенов'
+
+    def handle(self, *args, **options):
+        processed = 0
+        for recipe in Recipe.objects.only(
+                'id', 'image', 'image_card').iterator():
+            if needs_processing(recipe):
+                process_recipe_image(recipe.id)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed}.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    """пересборка лент подписок из подписок и рецептов."""
+    help = 'Перестраиваем ленты подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'users', nargs='*', type=int,
+            help='id пользователей, по умолчанию все',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            entries = rebuild_feeds(users=options['users'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {entries}.'))
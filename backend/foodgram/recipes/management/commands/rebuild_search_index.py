@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    """полная перестройка поискового индекса рецептов."""
+    help = 'Перестраиваем поисковый индекс рецептов'
+
+    def handle(self, *args, **options):
+        update_search_index(Recipe.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {Recipe.objects.count()}.'))
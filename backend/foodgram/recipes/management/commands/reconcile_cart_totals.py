@@ -0,0 +1,37 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.cart_totals import rebuild_cart_totals
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """сверка итогов корзин с суммой ингредиентов рецептов в корзине."""
+    help = 'Сверяем и пересобираем итоги корзин по ингредиентам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='только показать расхождения, не исправляя их',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        user_ids = list(User.objects.order_by('pk').values_list(
+            'pk', flat=True))
+        batch_size = options['batch_size']
+        drift = 0
+        for start in range(0, len(user_ids), batch_size):
+            with transaction.atomic():
+                drift += rebuild_cart_totals(
+                    users=user_ids[start:start + batch_size],
+                    fix=not options['check'],
+                )
+        self.stdout.write(f'расхождений {drift}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Сверка завершена за {time.perf_counter() - started:.2f} с.'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount_counters
+
+
+class Command(BaseCommand):
+    """пересчет счетчиков избранного, корзин, рецептов и подписчиков."""
+    help = 'Пересчитываем денормализованные счетчики'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='только показать расхождения, не исправляя их',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            drift = recount_counters(fix=not options['check'])
+        for counter, drifted in drift.items():
+            self.stdout.write(f'{counter}: расхождений {drifted}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчет завершен за {time.perf_counter() - started:.2f} с.'))
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:45
+
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+MAX_AMOUNT = 32767
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """перенос ссылок с дублей ингредиента на первый и удаление дублей.
+
+    Если в рецепте несколько дублей одного ингредиента, остается одна
+    строка с суммой их количеств. Отложенные проверки внешних ключей
+    PostgreSQL выполняются сразу: иначе ALTER TABLE в той же транзакции
+    падает с "pending trigger events".
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for group in duplicates:
+        keep_id = group['keep_id']
+        extra_ids = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=keep_id).values_list('id', flat=True))
+        rows = IngredientRecipe.objects.filter(
+            ingredient_id__in=[keep_id, *extra_ids]
+        ).order_by('recipe_id', 'id').values_list(
+            'id', 'recipe_id', 'ingredient_id', 'amount')
+        for _, recipe_rows in groupby(rows, key=itemgetter(1)):
+            recipe_rows = list(recipe_rows)
+            kept = next(
+                (row for row in recipe_rows if row[2] == keep_id),
+                recipe_rows[0])
+            IngredientRecipe.objects.filter(id__in=[
+                row[0] for row in recipe_rows if row is not kept
+            ]).delete()
+            IngredientRecipe.objects.filter(id=kept[0]).update(
+                ingredient_id=keep_id,
+                amount=min(sum(row[3] for row in recipe_rows), MAX_AMOUNT),
+            )
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_auto_20221023_2258'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
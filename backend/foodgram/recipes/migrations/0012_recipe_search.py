@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:57
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+FTS_TABLE = 'recipes_recipe_fts'
+GIN_INDEX = 'recipe_search_vector_gin'
+INGREDIENT_NAMES = (
+    "(SELECT group_concat(i.name, ' ') "
+    'FROM recipes_ingredientrecipe ir '
+    'JOIN recipes_ingredient i ON i.id = ir.ingredient_id '
+    'WHERE ir.recipe_id = r.id)'
+)
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс на PostgreSQL или таблица FTS5 на SQLite
+    и индексация уже созданных рецептов."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {GIN_INDEX} ON recipes_recipe '
+            'USING GIN (search_vector)')
+        schema_editor.execute(
+            'UPDATE recipes_recipe r SET search_vector = '
+            "setweight(to_tsvector(%(config)s::regconfig, r.name), 'A') || "
+            'setweight(to_tsvector(%(config)s::regconfig, coalesce('
+            + INGREDIENT_NAMES.replace('group_concat', 'string_agg')
+            + ", '')), 'B') || "
+            "setweight(to_tsvector(%(config)s::regconfig, r.text), 'C')",
+            {'config': getattr(settings, 'SEARCH_CONFIG', 'russian')})
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            'name, text, ingredients, '
+            'tokenize="unicode61 remove_diacritics 2")')
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, text, ingredients) '
+            f'SELECT r.id, r.name, r.text, {INGREDIENT_NAMES} '
+            'FROM recipes_recipe r')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
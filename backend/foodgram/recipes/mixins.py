@@ -0,0 +1,23 @@
+class ProtectedFieldsMixin:
+    """Не перезаписывает защищенные поля при сохранении всей модели.
+
+    protected_fields меняются только своими писателями: счетчики через
+    F() и пересчет, служебные флаги через update(), рендишены фото
+    фоновой задачей. Обычный save() уже существующей записи сохраняет
+    все поля, кроме них; писатель такого поля передает update_fields.
+    Не загруженные (отложенные) поля тоже не сохраняются, чтобы save()
+    не читал их из БД по одному.
+    """
+    protected_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and self.protected_fields
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.protected_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
@@ -1,8 +1,13 @@
+import uuid
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
 
+from recipes.mixins import ProtectedFieldsMixin
+
 User = get_user_model()
 
 
@@ -21,6 +26,12 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_name_unit'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}.'
@@ -59,12 +70,13 @@ class Tag(models.Model):
         ]
 
 
-class Recipe(models.Model):
+class Recipe(ProtectedFieldsMixin, models.Model):
     """Модель рецепта."""
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='recipes',
+        db_index=False,
         verbose_name='Автор рецепта'
     )
     name = models.CharField(
@@ -78,6 +90,18 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Фото блюда'
     )
+    image_card = models.ImageField(
+        upload_to='recipes/renditions/card/',
+        blank=True,
+        editable=False,
+        verbose_name='Фото для карточки'
+    )
+    image_detail = models.ImageField(
+        upload_to='recipes/renditions/detail/',
+        blank=True,
+        editable=False,
+        verbose_name='Фото для страницы рецепта'
+    )
     ingredients = models.ManyToManyField(
         Ingredient, through='IngredientRecipe',
         related_name='recipes',
@@ -100,11 +124,45 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+    neighbours_stale = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Похожие рецепты устарели'
+    )
+
+    # счетчики и флаг меняются только через update(), а рендишены -
+    # фоновой задачей и заменой фото
+    protected_fields = (
+        'favorites_count', 'in_carts_count', 'neighbours_stale',
+        'image_card', 'image_detail',
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -120,6 +178,7 @@ class IngredientRecipe(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Рецепт'
     )
     amount = models.PositiveSmallIntegerField(
@@ -138,6 +197,48 @@ class IngredientRecipe(models.Model):
                 name='unique_recipe_ingredient'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient', 'amount'],
+                name='ingredientrecipe_covering_idx'
+            ),
+        ]
+
+
+class RecipeNeighbour(models.Model):
+    """Похожий рецепт по общим ингредиентам, считается командой."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='neighbours',
+        verbose_name='Рецепт'
+    )
+    neighbour = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbour_of',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'neighbour'],
+                name='unique_recipe_neighbour'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='recipeneighbour_score_idx'
+            ),
+        ]
 
 
 class TagRecipe(models.Model):
@@ -145,6 +246,7 @@ class TagRecipe(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Рецепт'
     )
     tag = models.ForeignKey(
@@ -168,6 +270,7 @@ class ShoppingCart(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Пользователь',
         related_name='shopping_cart',
     )
@@ -189,11 +292,75 @@ class ShoppingCart(models.Model):
         ]
 
 
+class ShoppingCartIngredient(models.Model):
+    """Итог по ингредиенту во всей корзине пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        verbose_name='Пользователь',
+        related_name='cart_ingredients',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в корзине'
+        verbose_name_plural = 'Ингредиенты в корзине'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_cart_ingredient'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика, раскладывается при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        verbose_name='Подписчик',
+        related_name='feed',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='feed_entries',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feedentry_user_pub_date_idx'),
+        ]
+
+
 class Favorite(models.Model):
     """Избранное."""
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Пользователь',
         related_name='favorites',
     )
@@ -213,3 +380,57 @@ class Favorite(models.Model):
                 name='user_favorite_unique'
             )
         ]
+
+
+class CatalogueVersion(models.Model):
+    """Версия справочника, меняется при каждом его изменении.
+
+    Хранится в БД, поэтому смену версии видят все процессы, в том числе
+    после загрузки справочника командой.
+    """
+    name = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name='Справочник'
+    )
+    version = models.UUIDField(
+        default=uuid.uuid4,
+        verbose_name='Версия'
+    )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время смены версии'
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+
+class CatalogueChange(models.Model):
+    """Запись журнала изменений: id измененного объекта.
+
+    Номер изменения - id записи. Запись без object_id означает, что
+    изменилось все, и читатели перестраивают свои данные целиком.
+    """
+    name = models.CharField(
+        max_length=50,
+        verbose_name='Журнал'
+    )
+    object_id = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Id объекта'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Время изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(fields=['name', 'id'],
+                         name='catalogue_change_name_idx'),
+        ]
@@ -0,0 +1,90 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery
+
+from recipes.models import IngredientRecipe
+
+FTS_TABLE = 'recipes_recipe_fts'
+BM25_WEIGHTS = '10.0, 1.0, 4.0'
+
+
+def get_vendor(queryset):
+    return connections[queryset.db].vendor
+
+
+def update_search_index(recipes):
+    """пересчет поискового индекса для рецептов одним запросом."""
+    vendor = get_vendor(recipes)
+    if vendor == 'postgresql':
+        config = settings.SEARCH_CONFIG
+        ingredients = Subquery(
+            IngredientRecipe.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                names=StringAgg('ingredient__name', ' ')
+            ).values('names')
+        )
+        recipes.update(search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector(ingredients, weight='B', config=config)
+            + SearchVector('text', weight='C', config=config)
+        ))
+    elif vendor == 'sqlite':
+        recipe_ids, params = (
+            recipes.order_by().values('pk').query.sql_with_params())
+        with connections[recipes.db].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({recipe_ids})',
+                params)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, name, text, ingredients) '
+                'SELECT r.id, r.name, r.text, ('
+                '  SELECT group_concat(i.name, \' \') '
+                '  FROM recipes_ingredientrecipe ir '
+                '  JOIN recipes_ingredient i ON i.id = ir.ingredient_id '
+                '  WHERE ir.recipe_id = r.id'
+                f') FROM recipes_recipe r WHERE r.id IN ({recipe_ids})',
+                params)
+
+
+def remove_from_search_index(recipe):
+    """удаление рецепта из FTS5; на PostgreSQL вектор уходит со строкой."""
+    connection = connections[recipe._state.db or 'default']
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe.pk])
+
+
+def search_recipes(queryset, query):
+    """рецепты, подходящие под запрос, по убыванию релевантности."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset
+    vendor = get_vendor(queryset)
+    if vendor == 'postgresql':
+        search_query = SearchQuery(query, config=settings.SEARCH_CONFIG)
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).filter(search_vector=search_query).order_by('-rank', '-pub_date')
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.extra(
+            select={'rank': f'{FTS_TABLE}.rank'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = recipes_recipe.id',
+                f'{FTS_TABLE} MATCH %s',
+                f"{FTS_TABLE}.rank MATCH 'bm25({BM25_WEIGHTS})'",
+            ],
+            params=[match],
+        ).order_by('rank', '-pub_date')
+    condition = Q()
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(text__icontains=word)
+    return queryset.filter(condition)
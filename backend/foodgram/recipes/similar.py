@@ -0,0 +1,121 @@
+from array import array
+from collections import Counter, defaultdict
+from heapq import nlargest
+from itertools import chain
+from math import sqrt
+
+from django.db import transaction
+from django.db.models import Count, Min
+
+from recipes.models import IngredientRecipe, Recipe, RecipeNeighbour
+
+METRICS = {
+    'cosine': lambda overlap, size, other: overlap / sqrt(size * other),
+    'jaccard': lambda overlap, size, other: overlap / (
+        size + other - overlap),
+}
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def mark_stale(recipes):
+    """похожие рецепты будут пересчитаны при следующем --changed."""
+    Recipe.objects.filter(pk__in=recipes).update(neighbours_stale=True)
+
+
+def load_matrix():
+    """разреженная матрица рецепт x ингредиент одним запросом.
+
+    Хранится строками (ингредиенты рецепта) и столбцами (отсортированные
+    id рецептов с ингредиентом), пересечение строки со всеми рецептами -
+    сумма ее столбцов.
+    """
+    rows, columns = defaultdict(list), defaultdict(lambda: array('l'))
+    pairs = IngredientRecipe.objects.order_by(
+        'recipe_id', 'ingredient_id').values_list('recipe', 'ingredient')
+    for recipe_id, ingredient_id in pairs.iterator():
+        rows[recipe_id].append(ingredient_id)
+        columns[ingredient_id].append(recipe_id)
+    return rows, columns
+
+
+def get_scores(recipe_id, rows, columns, metric):
+    """сходство рецепта со всеми рецептами, у которых есть общие
+    ингредиенты."""
+    ingredients = rows.get(recipe_id, ())
+    overlaps = Counter(chain.from_iterable(
+        columns[ingredient_id] for ingredient_id in ingredients))
+    overlaps.pop(recipe_id, None)
+    similarity = METRICS[metric]
+    size = len(ingredients)
+    return {
+        other: similarity(overlap, size, len(rows[other]))
+        for other, overlap in overlaps.items()
+    }
+
+
+def top(scores, limit):
+    """limit самых похожих, при равенстве - более новые."""
+    return nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+
+
+def get_affected(stale, rows, columns, metric, limit, chunk_size):
+    """рецепты, чей список похожих меняется из-за измененных.
+
+    Это сами измененные, те, у кого они уже в списке, и те, в чей
+    список они попадают с новым сходством.
+    """
+    affected = set(stale)
+    for chunk in chunks(stale, chunk_size):
+        affected.update(RecipeNeighbour.objects.filter(
+            neighbour__in=chunk).values_list('recipe', flat=True))
+    thresholds = {
+        recipe_id: lowest if count >= limit else 0
+        for recipe_id, lowest, count in RecipeNeighbour.objects.order_by(
+        ).values('recipe').annotate(
+            lowest=Min('score'), count=Count('pk')
+        ).values_list('recipe', 'lowest', 'count')
+    }
+    for recipe_id in stale:
+        for other, score in get_scores(
+                recipe_id, rows, columns, metric).items():
+            if score >= thresholds.get(other, 0):
+                affected.add(other)
+    return affected
+
+
+def build_neighbours(changed_only=False, limit=10, metric='cosine',
+                     chunk_size=1000):
+    """пересчет похожих рецептов, возвращает число пересчитанных.
+
+    Флаг устаревания снимается до чтения ингредиентов, поэтому правки
+    во время расчета попадут в следующий запуск. Результат пишется
+    по chunk_size рецептов, в памяти только матрица и одна пачка.
+    """
+    stale = Recipe.objects.all()
+    if changed_only:
+        stale = stale.filter(neighbours_stale=True)
+    stale = list(stale.values_list('pk', flat=True))
+    for chunk in chunks(stale, chunk_size):
+        Recipe.objects.filter(pk__in=chunk).update(neighbours_stale=False)
+    rows, columns = load_matrix()
+    targets = stale
+    if changed_only:
+        targets = get_affected(
+            stale, rows, columns, metric, limit, chunk_size)
+    targets = sorted(targets)
+    for chunk in chunks(targets, chunk_size):
+        neighbours = [
+            RecipeNeighbour(
+                recipe_id=recipe_id, neighbour_id=other, score=score)
+            for recipe_id in chunk
+            for other, score in top(
+                get_scores(recipe_id, rows, columns, metric), limit)
+        ]
+        with transaction.atomic():
+            RecipeNeighbour.objects.filter(recipe__in=chunk).delete()
+            RecipeNeighbour.objects.bulk_create(neighbours)
+    return len(targets)
@@ -0,0 +1,33 @@
+from jobs.queue import task
+from recipes.feed import backfill_feed, fan_out_recipe
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+from recipes.search import update_search_index
+from users.models import Follow
+
+
+@task('recipes.process_image')
+def process_image(recipe_id):
+    """создание рендишенов изображения рецепта."""
+    process_recipe_image(recipe_id)
+
+
+@task('recipes.reindex_ingredient')
+def reindex_ingredient(ingredient_id):
+    """обновление поискового индекса рецептов с ингредиентом."""
+    update_search_index(Recipe.objects.filter(ingredients=ingredient_id))
+
+
+@task('recipes.fan_out_recipe')
+def fan_out(recipe_id):
+    """раскладка нового рецепта по лентам подписчиков."""
+    return {'entries': fan_out_recipe(recipe_id)}
+
+
+@task('recipes.backfill_feed')
+def backfill(author_ids, user_id=None):
+    """рецепты авторов в ленту подписчика или всех их подписчиков."""
+    follows = Follow.objects.filter(author__in=author_ids)
+    if user_id is not None:
+        follows = follows.filter(user=user_id)
+    return {'entries': backfill_feed(follows)}
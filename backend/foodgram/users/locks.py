@@ -0,0 +1,21 @@
+from django.db import connection
+
+# пространство ключей advisory-блокировок пользователей
+USER_LOCK_NAMESPACE = 0x75736572
+
+
+def lock_user(user_id):
+    """блокировка изменений связей пользователя до конца транзакции.
+
+    Изменения связей одного пользователя идут по одному, поэтому
+    прочитанные до записи связи не расходятся с записанными. На
+    PostgreSQL берется advisory-блокировка по id, а не строка
+    пользователя: строку автора блокируют FK и счетчик подписчиков, и
+    встречные подписки двух пользователей взаимно блокировались бы.
+    SQLite и так выполняет пишущие транзакции по одной.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)',
+                [USER_LOCK_NAMESPACE, user_id])
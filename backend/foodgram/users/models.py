@@ -3,8 +3,10 @@ from django.core.validators import RegexValidator
 from django.db import models
 from django.forms import ValidationError
 
+from recipes.mixins import ProtectedFieldsMixin
 
-class User(AbstractUser):
+
+class User(ProtectedFieldsMixin, AbstractUser):
     """Модель пользователя."""
     ADMIN = 'admin'
     USER = 'user'
@@ -40,7 +42,18 @@ class User(AbstractUser):
         choices=ROLES,
         default=USER,
         verbose_name='Роль')
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
 
+    protected_fields = ('recipes_count', 'followers_count')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name', 'password')
 
@@ -63,11 +76,11 @@ class Follow(models.Model):
     """Модель подписчика."""
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='follower',
-        null=True, verbose_name='Подписчик'
+        null=True, db_index=False, verbose_name='Подписчик'
     )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='author',
-        null=True, verbose_name='Автор рецепта'
+        null=True, db_index=False, verbose_name='Автор рецепта'
     )
 
     class Meta:
@@ -77,6 +90,10 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=('user', 'author'),
                                     name='follow_1_time_no_self_follow'),
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
 
     def clean(self):
         if self.user.id == self.author.id: